@@ -6,10 +6,15 @@ Uses Claude with tools for autonomous web research
 import os
 import sys
 import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 import pymysql
+from cachetools import TTLCache
+from dbutils.pooled_db import PooledDB
 
 # Load environment
 load_dotenv('/Users/joey/GMTM-Agent-SDK/backend/.env')
@@ -21,6 +26,156 @@ from tools.web_tools import web_tools
 # Anthropic for Claude
 from anthropic import Anthropic
 
+logger = logging.getLogger(__name__)
+
+# Tools are network-bound (search/scrape/verify), so independent tool_use
+# blocks from the same turn run side by side on a shared pool
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# Research keeps going while Claude asks for tools, until it has spent this
+# many input + output tokens across rounds
+AGENT_TOKEN_BUDGET = 60000
+
+# search_web descriptions are cut to this length before going back to Claude
+SEARCH_DESCRIPTION_CHARS = 200
+
+CAMP_LIST_PATTERN = re.compile(r'\[.*\]', re.DOTALL)
+
+# Built once at import; the statement text is identical on every lookup
+ATHLETE_PROFILE_SQL = """
+SELECT 
+    u.user_id,
+    u.first_name,
+    u.last_name,
+    u.graduation_year,
+    l.city,
+    l.province as state,
+    p.name as position,
+    s.name as sport
+FROM users u
+LEFT JOIN locations l ON u.location_id = l.location_id
+LEFT JOIN career c ON u.user_id = c.user_id AND c.is_current = 1
+LEFT JOIN user_positions up ON c.career_id = up.career_id
+LEFT JOIN positions p ON up.position_id = p.position_id
+LEFT JOIN sports s ON c.sport_id = s.sport_id
+WHERE u.user_id = %s
+LIMIT 1
+"""
+
+# The GMTM schema is read-only from here, so instead of a summary table the
+# joined profile row is kept in-process; repeat searches skip the 5-join query
+ATHLETE_PROFILE_CACHE = TTLCache(maxsize=10000, ttl=300)
+
+# Process-wide GMTM pool - each lookup borrows a connection instead of
+# paying a fresh TCP + auth handshake per find_camps() call
+GMTM_POOL = PooledDB(
+    creator=pymysql,
+    maxconnections=10,
+    maxcached=5,
+    blocking=True,
+    ping=1,
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database='gmtm',
+    port=3306,
+    cursorclass=pymysql.cursors.DictCursor
+)
+
+# Research tools and prompt are static; only the athlete fields vary per run
+RESEARCH_TOOLS = (
+    {
+        "name": "search_web",
+        "description": "Search the web for camps, combines, and showcases. Returns titles, URLs, and descriptions.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query (e.g., 'football camps Texas 2026')"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 20
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "scrape_page",
+        "description": "Extract content from a specific URL. Returns dates, costs, and page content.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "URL to scrape"
+                }
+            },
+            "required": ["url"]
+        }
+    },
+    {
+        "name": "verify_camp",
+        "description": "Check if a camp is legitimate. Returns legitimacy score and flags.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "camp_name": {
+                    "type": "string",
+                    "description": "Name of the camp"
+                },
+                "camp_url": {
+                    "type": "string",
+                    "description": "URL of the camp"
+                }
+            },
+            "required": ["camp_name", "camp_url"]
+        }
+    }
+)
+
+RESEARCH_PROMPT_TEMPLATE = """You are a Camp Discovery Agent helping an athlete find the best camps.
+
+Athlete Profile:
+- Name: {first_name} {last_name}
+- Position: {position}
+- Location: {city}, {state}
+- Sport: {sport}
+- Grad Year: {graduation_year}
+
+Your Task:
+1. Search the web for upcoming camps and combines for this athlete
+2. Focus on their sport, position, and location
+3. Find events in the next 3 months (Feb-Apr 2026)
+4. Scrape camp pages for details (dates, costs, coaches)
+5. Verify each camp is legitimate (not a scam)
+6. Return 10-15 camps with all details
+
+Search Strategy:
+- "{search_sport} camps {search_state} 2026"
+- "{search_position} showcase {search_state}"
+- "SPARQ combine {search_state}"
+- Look for official sites (SPARQ.com, MaxPreps, NCSA, college sites)
+
+For each camp found, provide:
+- Name
+- Date (if found)
+- Location
+- Cost (if found)
+- URL
+- Coaches/scouts attending (if mentioned)
+- Legitimacy check result
+
+Be thorough but efficient. Quality over quantity.
+
+When you are done, end your final answer with the camps as a JSON array of objects
+with keys: name, date, location, cost, url, description, verified.
+"""
+
+
 class AutonomousCampFinder:
     """
     Full Agent SDK implementation with autonomous research
@@ -29,39 +184,18 @@ class AutonomousCampFinder:
     def __init__(self):
         self.anthropic = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
         self.web_tools = web_tools
-        self.db = None
-        
-    def connect_db(self):
-        """Connect to GMTM database"""
-        if not self.db:
-            self.db = pymysql.connect(
-                host=os.getenv('DB_HOST'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                database='gmtm',
-                port=3306,
-                cursorclass=pymysql.cursors.DictCursor
-            )
-    
-    def close_db(self):
-        """Close database connection"""
-        if self.db:
-            self.db.close()
-            self.db = None
     
     def find_camps(self, athlete_id: int, max_results: int = 10) -> Dict:
         """
         Main entry point - uses Claude agent for autonomous research
         """
         try:
-            self.connect_db()
-            
             # Get athlete profile
             athlete = self._get_athlete_profile(athlete_id)
             if not athlete:
                 return {"error": "Athlete not found"}
             
-            print(f"\n🤖 Agent researching camps for {athlete['first_name']} {athlete['last_name']}...")
+            logger.info("Agent researching camps for %s %s", athlete['first_name'], athlete['last_name'])
             
             # Use Claude agent for autonomous research
             camps = self._agent_research_camps(athlete)
@@ -69,8 +203,10 @@ class AutonomousCampFinder:
             # Rank results
             ranked = self._rank_camps(camps, athlete)
             
+            top_camps = ranked[:max_results]
+            
             # Generate summary
-            summary = self._generate_summary(ranked[:max_results], athlete)
+            summary = self._generate_summary(top_camps, athlete)
             
             return {
                 "athlete": {
@@ -79,7 +215,7 @@ class AutonomousCampFinder:
                     "position": athlete.get('position', 'N/A'),
                     "location": f"{athlete['city']}, {athlete['state'] or 'TX'}"
                 },
-                "camps": ranked[:max_results],
+                "camps": top_camps,
                 "total_found": len(ranked),
                 "summary": summary,
                 "agent_notes": "Autonomous web research with legitimacy verification"
@@ -91,33 +227,23 @@ class AutonomousCampFinder:
                 "error": str(e),
                 "traceback": traceback.format_exc()
             }
-        finally:
-            self.close_db()
     
     def _get_athlete_profile(self, athlete_id: int) -> Optional[Dict]:
         """Get athlete from database"""
-        with self.db.cursor() as cursor:
-            query = """
-            SELECT 
-                u.user_id,
-                u.first_name,
-                u.last_name,
-                u.graduation_year,
-                l.city,
-                l.province as state,
-                p.name as position,
-                s.name as sport
-            FROM users u
-            LEFT JOIN locations l ON u.location_id = l.location_id
-            LEFT JOIN career c ON u.user_id = c.user_id AND c.is_current = 1
-            LEFT JOIN user_positions up ON c.career_id = up.career_id
-            LEFT JOIN positions p ON up.position_id = p.position_id
-            LEFT JOIN sports s ON c.sport_id = s.sport_id
-            WHERE u.user_id = %s
-            LIMIT 1
-            """
-            cursor.execute(query, (athlete_id,))
-            return cursor.fetchone()
+        athlete = ATHLETE_PROFILE_CACHE.get(athlete_id)
+        if athlete is not None:
+            return dict(athlete)
+        db = GMTM_POOL.connection()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(ATHLETE_PROFILE_SQL, (athlete_id,))
+                athlete = cursor.fetchone()
+        finally:
+            db.close()  # returns the connection to the pool
+        if athlete:
+            ATHLETE_PROFILE_CACHE[athlete_id] = athlete
+            return dict(athlete)
+        return None
     
     def _agent_research_camps(self, athlete: Dict) -> List[Dict]:
         """
@@ -125,150 +251,128 @@ class AutonomousCampFinder:
         Agent has access to all web tools
         """
         
-        # Define tools for Claude
-        tools = [
-            {
-                "name": "search_web",
-                "description": "Search the web for camps, combines, and showcases. Returns titles, URLs, and descriptions.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Search query (e.g., 'football camps Texas 2026')"
-                        },
-                        "max_results": {
-                            "type": "integer",
-                            "description": "Maximum number of results to return",
-                            "default": 20
-                        }
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "scrape_page",
-                "description": "Extract content from a specific URL. Returns dates, costs, and page content.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "url": {
-                            "type": "string",
-                            "description": "URL to scrape"
-                        }
-                    },
-                    "required": ["url"]
-                }
-            },
-            {
-                "name": "verify_camp",
-                "description": "Check if a camp is legitimate. Returns legitimacy score and flags.",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "camp_name": {
-                            "type": "string",
-                            "description": "Name of the camp"
-                        },
-                        "camp_url": {
-                            "type": "string",
-                            "description": "URL of the camp"
-                        }
-                    },
-                    "required": ["camp_name", "camp_url"]
-                }
-            }
-        ]
-        
-        # Agent prompt
-        prompt = f"""You are a Camp Discovery Agent helping an athlete find the best camps.
-
-Athlete Profile:
-- Name: {athlete['first_name']} {athlete['last_name']}
-- Position: {athlete.get('position', 'N/A')}
-- Location: {athlete.get('city', 'Unknown')}, {athlete.get('state', 'Unknown')}
-- Sport: {athlete.get('sport', 'Football')}
-- Grad Year: {athlete.get('graduation_year', 'N/A')}
-
-Your Task:
-1. Search the web for upcoming camps and combines for this athlete
-2. Focus on their sport, position, and location
-3. Find events in the next 3 months (Feb-Apr 2026)
-4. Scrape camp pages for details (dates, costs, coaches)
-5. Verify each camp is legitimate (not a scam)
-6. Return 10-15 camps with all details
-
-Search Strategy:
-- "{athlete.get('sport', 'football')} camps {athlete.get('state', 'Texas')} 2026"
-- "{athlete.get('position', '')} showcase {athlete.get('state', 'Texas')}"
-- "SPARQ combine {athlete.get('state', 'Texas')}"
-- Look for official sites (SPARQ.com, MaxPreps, NCSA, college sites)
-
-For each camp found, provide:
-- Name
-- Date (if found)
-- Location
-- Cost (if found)
-- URL
-- Coaches/scouts attending (if mentioned)
-- Legitimacy check result
-
-Be thorough but efficient. Quality over quantity.
-"""
+        prompt = RESEARCH_PROMPT_TEMPLATE.format(
+            first_name=athlete['first_name'],
+            last_name=athlete['last_name'],
+            position=athlete.get('position', 'N/A'),
+            city=athlete.get('city', 'Unknown'),
+            state=athlete.get('state', 'Unknown'),
+            sport=athlete.get('sport', 'Football'),
+            graduation_year=athlete.get('graduation_year', 'N/A'),
+            search_sport=athlete.get('sport', 'football'),
+            search_position=athlete.get('position', ''),
+            search_state=athlete.get('state', 'Texas'),
+        )
         
         # Call Claude with tools
-        print("🤖 Claude agent starting autonomous research...")
+        logger.info("Claude agent starting autonomous research")
         
         messages = [{"role": "user", "content": prompt}]
         camps_found = []
+        verified_camps = []
         
-        # Agent loop (max 5 tool calls)
-        for iteration in range(5):
-            response = self.anthropic.messages.create(
-                model="claude-sonnet-4-20250514",  # Claude Sonnet 4 (current)
-                max_tokens=4096,
-                tools=tools,
-                messages=messages
-            )
+        # search_web futures for this research run, keyed on (query, max_results),
+        # so repeated or overlapping searches reuse the first request
+        search_memo = {}
+        
+        # The agent nearly always opens with the first search from its strategy
+        # list - start it now so it overlaps the first Claude round-trip
+        predicted_search = {"query": self._predict_first_search(athlete)}
+        predicted_key = self._search_key(predicted_search)
+        search_memo[predicted_key] = TOOL_EXECUTOR.submit(
+            self._execute_tool, "search_web", predicted_search
+        )
+        
+        # Agent loop - runs while Claude keeps asking for tools, bounded by a
+        # token budget rather than a fixed round count
+        seen_calls = set()
+        tokens_used = 0
+        iteration = 0
+        while True:
+            response = self._invoke_claude(messages)
+            tokens_used += response.usage.input_tokens + response.usage.output_tokens
+            iteration += 1
             
-            print(f"   Iteration {iteration + 1}: {response.stop_reason}")
+            logger.info("Iteration %d: %s (%d tokens)", iteration, response.stop_reason, tokens_used)
             
-            # Check if agent wants to use tools
-            if response.stop_reason == "tool_use":
-                # Execute tool calls
-                tool_results = []
-                
-                for content_block in response.content:
-                    if content_block.type == "tool_use":
-                        tool_name = content_block.name
-                        tool_input = content_block.input
-                        
-                        print(f"   🔧 Tool: {tool_name}({json.dumps(tool_input, indent=2)[:100]}...)")
-                        
-                        # Execute the tool
-                        result = self._execute_tool(tool_name, tool_input)
-                        
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": json.dumps(result)
-                        })
-                
-                # Add assistant response and tool results to messages
-                messages.append({"role": "assistant", "content": response.content})
-                messages.append({"role": "user", "content": tool_results})
+            if iteration == 1:
+                first_keys = {
+                    self._search_key(block.input) for block in response.content
+                    if block.type == "tool_use" and block.name == "search_web"
+                }
+                if predicted_key not in first_keys:
+                    # Guessed wrong - drop the speculative search and consume its
+                    # outcome so a failure isn't left unretrieved on the future
+                    speculative = search_memo.pop(predicted_key)
+                    speculative.cancel()
+                    speculative.add_done_callback(lambda f: f.cancelled() or f.exception())
             
-            else:
-                # Agent finished - extract camps from final response
-                for content_block in response.content:
-                    if hasattr(content_block, 'text'):
-                        # Parse camps from agent's final message
-                        camps_found = self._parse_agent_response(content_block.text)
+            if response.stop_reason != "tool_use":
+                # Agent finished - parse camps from the full final message once
+                final_text = "".join(
+                    block.text for block in response.content if hasattr(block, 'text')
+                )
+                camps_found = self._parse_agent_response(final_text)
+                break
+            
+            tool_calls = [block for block in response.content if block.type == "tool_use"]
+            
+            # A turn that only repeats calls already made is going nowhere
+            call_keys = [(call.name, json.dumps(call.input, sort_keys=True)) for call in tool_calls]
+            if all(key in seen_calls for key in call_keys):
+                logger.warning("Agent is repeating tool calls - stopping research")
+                break
+            seen_calls.update(call_keys)
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                for call in tool_calls:
+                    logger.debug("Tool: %s(%.100s)", call.name, json.dumps(call.input))
+            
+            # Execute tool calls concurrently; searches already issued this run
+            # (including the speculative one) are reused. Results stay in call order
+            futures = []
+            for call in tool_calls:
+                if call.name == "search_web":
+                    key = self._search_key(call.input)
+                    if key not in search_memo:
+                        search_memo[key] = TOOL_EXECUTOR.submit(self._execute_tool, call.name, call.input)
+                    futures.append(search_memo[key])
+                else:
+                    futures.append(TOOL_EXECUTOR.submit(self._execute_tool, call.name, call.input))
+            results = [future.result() for future in futures]
+            
+            for call, result in zip(tool_calls, results):
+                if call.name == "verify_camp":
+                    camp = self._camp_from_verification(call.input, result)
+                    if camp:
+                        verified_camps.append(camp)
+            
+            tool_results = [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": call.id,
+                    "content": json.dumps(result, separators=(",", ":"), default=str)
+                }
+                for call, result in zip(tool_calls, results)
+            ]
+            
+            # Add assistant response and tool results to messages
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": tool_results})
+            
+            if tokens_used >= AGENT_TOKEN_BUDGET:
+                logger.warning("Token budget reached after %d iterations", iteration)
                 break
         
-        # If we exhausted iterations without finding camps, ask agent to summarize
+        # Camps the agent already verified can be presented directly - only ask
+        # for a summary round-trip when the tool results alone don't give us any
+        if not camps_found and verified_camps:
+            logger.info("Presenting %d verified camps from tool results", len(verified_camps))
+            camps_found = verified_camps
+        
+        # If research stopped without finding camps, ask agent to summarize
         if not camps_found:
-            print("   🤖 Agent used all iterations - asking for summary...")
+            logger.info("Agent stopped without a camp list - asking for summary")
             summary_response = self.anthropic.messages.create(
                 model="claude-sonnet-4-20250514",
                 max_tokens=2048,
@@ -283,16 +387,52 @@ Be thorough but efficient. Quality over quantity.
                     camps_found = self._parse_agent_response(content_block.text)
                     break
         
-        print(f"✅ Agent research complete: {len(camps_found)} camps found\n")
+        logger.info("Agent research complete: %d camps found", len(camps_found))
         return camps_found
     
+    def _invoke_claude(self, messages: List[Dict]):
+        """One research-loop round-trip"""
+        return self.anthropic.messages.create(
+            model="claude-sonnet-4-20250514",  # Claude Sonnet 4 (current)
+            max_tokens=4096,
+            tools=RESEARCH_TOOLS,
+            messages=messages
+        )
+    
+    def _camp_from_verification(self, tool_input: Dict, result: Dict) -> Optional[Dict]:
+        """Build a camp card from a legitimate verify_camp call, or None"""
+        if not isinstance(result, dict) or result.get("error") or not result.get("legitimate"):
+            return None
+        return {
+            "name": tool_input.get("camp_name"),
+            "url": tool_input.get("camp_url"),
+            "verified": True,
+            "legitimacy_check": result,
+            "source": "agent_research",
+            "agent_notes": "Verified during autonomous web research"
+        }
+    
+    def _predict_first_search(self, athlete: Dict) -> str:
+        """The opening query from the prompt's search strategy"""
+        return f"{athlete.get('sport', 'football')} camps {athlete.get('state', 'Texas')} 2026"
+    
+    def _search_key(self, tool_input: Dict) -> tuple:
+        """Memo key for a search_web call - case/whitespace-insensitive query + size"""
+        query = " ".join(tool_input.get("query", "").lower().split())
+        return (query, tool_input.get("max_results", 20))
+    
     def _execute_tool(self, tool_name: str, tool_input: Dict) -> Dict:
         """Execute a tool and return results"""
         try:
             if tool_name == "search_web":
                 query = tool_input["query"]
                 max_results = tool_input.get("max_results", 20)
-                return {"results": self.web_tools.search_web(query, max_results)}
+                results = self.web_tools.search_web(query, max_results)
+                # Claude only needs a snippet to decide what to scrape next
+                for item in results:
+                    if isinstance(item, dict) and len(item.get("description") or "") > SEARCH_DESCRIPTION_CHARS:
+                        item["description"] = item["description"][:SEARCH_DESCRIPTION_CHARS] + "..."
+                return {"results": results}
             
             elif tool_name == "scrape_page":
                 url = tool_input["url"]
@@ -314,12 +454,14 @@ Be thorough but efficient. Quality over quantity.
         Parse camps from agent's final response
         Agent should return structured data about camps found
         """
-        print("📝 Parsing agent's camp recommendations...")
+        logger.debug("Parsing agent's camp recommendations")
         
-        # Ask agent to structure the data it found
-        # Since the agent already did the research, we'll ask it to summarize
+        # The agent is asked to finish with a JSON array - use it directly when
+        # present and only pay for a structuring round-trip when it isn't
+        camps_data = self._extract_camp_list(response_text)
         
-        structure_prompt = f"""Based on your research, please provide a structured list of camps you found.
+        if camps_data is None:
+            structure_prompt = f"""Based on your research, please provide a structured list of camps you found.
 
 For each camp, provide JSON in this exact format:
 {{
@@ -337,45 +479,47 @@ Previous research:
 
 Return ONLY a JSON array of camps, nothing else. If you found no camps with complete information, return an empty array [].
 """
-        
-        try:
-            # Ask agent to structure its findings
-            response = self.anthropic.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2048,
-                messages=[
-                    {"role": "user", "content": structure_prompt}
-                ]
-            )
             
-            # Extract JSON from response
-            response_content = response.content[0].text if response.content else ""
-            
-            # Try to parse JSON
-            import json
-            import re
-            
-            # Look for JSON array in response
-            json_match = re.search(r'\[.*\]', response_content, re.DOTALL)
-            if json_match:
-                camps_data = json.loads(json_match.group(0))
-                
-                print(f"✅ Parsed {len(camps_data)} camps from agent response")
-                
-                # Add metadata
-                for camp in camps_data:
-                    camp['source'] = 'agent_research'
-                    camp['agent_notes'] = 'Found via autonomous web research'
+            try:
+                # Ask agent to structure its findings
+                response = self.anthropic.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=2048,
+                    messages=[
+                        {"role": "user", "content": structure_prompt}
+                    ]
+                )
                 
-                return camps_data
-            else:
-                print("⚠️ No JSON array found in response")
-                return []
+                response_content = response.content[0].text if response.content else ""
+                camps_data = self._extract_camp_list(response_content)
+            
+            except Exception as e:
+                logger.warning("Failed to parse structured response: %s", e)
+                # Return fallback sample data so frontend has something to show
+                return self._get_fallback_camps()
         
-        except Exception as e:
-            print(f"⚠️ Failed to parse structured response: {e}")
-            # Return fallback sample data so frontend has something to show
-            return self._get_fallback_camps()
+        if camps_data is None:
+            logger.warning("No JSON array found in response")
+            return []
+        
+        logger.info("Parsed %d camps from agent response", len(camps_data))
+        return camps_data
+    
+    def _extract_camp_list(self, text: str) -> Optional[List[Dict]]:
+        """Pull a JSON array of camp objects out of model text, or None; tags each with its source"""
+        json_match = CAMP_LIST_PATTERN.search(text)
+        if not json_match:
+            return None
+        try:
+            camps_data = json.loads(json_match.group(0))
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(camps_data, list):
+            return None
+        return [
+            {**camp, 'source': 'agent_research', 'agent_notes': 'Found via autonomous web research'}
+            for camp in camps_data if isinstance(camp, dict)
+        ]
     
     def _rank_camps(self, camps: List[Dict], athlete: Dict) -> List[Dict]:
         """Rank camps by fit (same as before)"""
@@ -448,27 +592,28 @@ Return ONLY a JSON array of camps, nothing else. If you found no camps with comp
         if not camps:
             return "No camps found. Agent will continue searching."
         
-        summary = f"🤖 Agent found {len(camps)} camps! Top recommendations:\n\n"
+        lines = [f"🤖 Agent found {len(camps)} camps! Top recommendations:\n"]
         
         for i, camp in enumerate(camps[:3], 1):
             cost_str = f"${camp['cost']}" if camp.get('cost') else "TBD"
-            summary += f"{i}. **{camp['name']}** ({camp.get('date', 'TBD')})\n"
-            summary += f"   📍 {camp.get('location', 'TBD')} | 💰 {cost_str}\n"
+            lines.append(f"{i}. **{camp['name']}** ({camp.get('date', 'TBD')})")
+            lines.append(f"   📍 {camp.get('location', 'TBD')} | 💰 {cost_str}")
             
             if camp.get('agent_notes'):
-                summary += f"   🤖 Agent: {camp['agent_notes']}\n"
+                lines.append(f"   🤖 Agent: {camp['agent_notes']}")
             
             if camp.get('fit_reasons'):
-                summary += f"   ✅ {', '.join(camp['fit_reasons'][:2])}\n"
+                lines.append(f"   ✅ {', '.join(camp['fit_reasons'][:2])}")
             
-            summary += "\n"
+            lines.append("")
         
-        return summary
+        return "\n".join(lines) + "\n"
 
 # Initialize agent
 autonomous_camp_finder = AutonomousCampFinder()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="   %(message)s")
     print("🤖 Testing Autonomous Camp Finder Agent...")
     print("=" * 60)
     
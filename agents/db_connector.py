@@ -7,6 +7,7 @@ Bypasses MCP to avoid iCloud sync issues.
 """
 
 import os
+import logging
 import mysql.connector
 from mysql.connector import Error
 from typing import Dict, List, Any, Optional
@@ -14,6 +15,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class GMTMDatabase:
     """Direct connection to GMTM MySQL database"""
     
@@ -34,17 +37,17 @@ class GMTMDatabase:
             self.connection = mysql.connector.connect(**self.config)
             if self.connection.is_connected():
                 db_info = self.connection.get_server_info()
-                print(f"✅ Connected to GMTM MySQL Server version {db_info}")
+                logger.debug("Connected to GMTM MySQL Server version %s", db_info)
                 return True
         except Error as e:
-            print(f"❌ Error connecting to MySQL: {e}")
+            logger.error("Error connecting to MySQL: %s", e)
             return False
     
     def disconnect(self):
         """Close database connection"""
         if self.connection and self.connection.is_connected():
             self.connection.close()
-            print("✅ MySQL connection closed")
+            logger.debug("MySQL connection closed")
     
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
@@ -68,8 +71,7 @@ class GMTMDatabase:
             results = cursor.fetchall()
             return results
         except Error as e:
-            print(f"❌ Query error: {e}")
-            print(f"Query: {query[:200]}...")
+            logger.error("Query error: %s\nQuery: %s...", e, query[:200])
             raise
         finally:
             if cursor:
@@ -2,20 +2,31 @@
 Profile Fetcher Agent
 =====================
 
-Fetches comprehensive athlete profile data using GMTM MCP.
+Fetches comprehensive athlete profile data straight from the GMTM database,
+falling back to GMTM MCP when the direct query fails.
 Returns structured profile data including metrics, highlights, and social links.
 """
 
 import os
-import re
 import json
+import asyncio
+import logging
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
+import pymysql
+from pymysql.constants import CLIENT
+from dbutils.pooled_db import PooledDB
+from dotenv import load_dotenv
+
 # Claude Agent SDK imports
 from claude_agent_sdk import query, ClaudeAgentOptions
 from claude_agent_sdk.types import AssistantMessage, ResultMessage, TextBlock, ToolUseBlock
 
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 # Path to the MCP configuration file
 MCP_CONFIG_PATH = Path("/Users/joey/Desktop/GMTM Marketing/.mcp.json")
 
@@ -32,6 +43,57 @@ SOCIAL_URL_PATTERNS = {
     "linkedin": "https://linkedin.com/in/{handle}",
 }
 
+# URL builders bound once at import; prefix + handle instead of str.format per row
+SOCIAL_URL_BUILDERS = {
+    platform.lower(): (lambda prefix: lambda handle: prefix + handle)(pattern.replace("{handle}", ""))
+    for platform, pattern in SOCIAL_URL_PATTERNS.items()
+}
+
+
+# Pool connections allow multi-statement queries so PROFILE_SQL comes back
+# in a single round-trip. Only the constant, parameterized PROFILE_SQL may run
+# on this pool — never interpolate user input into a query here.
+_PROFILE_MULTI_POOL = PooledDB(
+    creator=pymysql,
+    maxconnections=10,
+    maxcached=5,
+    blocking=True,
+    ping=1,
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database='gmtm',
+    port=3306,
+    client_flag=CLIENT.MULTI_STATEMENTS,
+    cursorclass=pymysql.cursors.DictCursor
+)
+
+# Profile, metrics, highlights and social profiles as four result sets
+PROFILE_SQL = """
+    SELECT u.user_id, u.first_name, u.last_name, u.graduation_year,
+           u.avatar_uri, u.about, l.city, l.province as state
+    FROM users u
+    LEFT JOIN locations l ON u.location_id = l.location_id
+    WHERE u.user_id = %(user_id)s;
+
+    SELECT m.title as metric_name, m.value, m.score as sparq_score,
+           m.percentile, ipe.name as event_name
+    FROM metrics m
+    LEFT JOIN in_person_events ipe ON m.in_person_event_id = ipe.in_person_event_id
+    WHERE m.user_id = %(user_id)s AND m.is_current = 1
+    ORDER BY m.score DESC;
+
+    SELECT f.film_id, f.title, f.thumbnail_uri, f.uri as video_url, f.published_on
+    FROM film f
+    WHERE f.user_id = %(user_id)s
+    ORDER BY f.published_on DESC
+    LIMIT 8;
+
+    SELECT mp.uri as handle, mp.name as platform, mp.type
+    FROM media_profiles mp
+    WHERE mp.user_id = %(user_id)s AND mp.uri IS NOT NULL;
+"""
+
 
 PROFILE_FETCH_PROMPT = """
 You are a data fetcher that retrieves comprehensive athlete profile data from the GMTM database.
@@ -106,10 +168,49 @@ Execute ALL queries using mcp__gmtmmcp__run_sql and compile the results.
 """
 
 
+# Only the prompt varies per athlete, so the MCP fallback shares one options object
+PROFILE_FETCH_OPTIONS = ClaudeAgentOptions(
+    mcp_servers=str(MCP_CONFIG_PATH),
+    allowed_tools=[
+        "mcp__gmtmmcp__run_sql",
+        "mcp__gmtmmcp__get_table_schema"
+    ],
+    permission_mode="bypassPermissions",
+    max_turns=8,
+    model="claude-sonnet-4-20250514",
+    cwd=str(MCP_CONFIG_PATH.parent)
+)
+
+
+def _fetch_profile_sql(user_id: int) -> Optional[Dict[str, Any]]:
+    """Run PROFILE_SQL and collect its four result sets, or None if the athlete is missing."""
+    db = _PROFILE_MULTI_POOL.connection()
+    try:
+        with db.cursor() as c:
+            c.execute(PROFILE_SQL, {"user_id": user_id})
+            result_sets = [c.fetchall()]
+            while c.nextset():
+                result_sets.append(c.fetchall())
+    finally:
+        db.close()
+
+    profile_rows, metrics, highlights, social_profiles = result_sets
+    if not profile_rows:
+        return None
+    return {
+        "profile": profile_rows[0],
+        "metrics": metrics,
+        "highlights": highlights,
+        "social_profiles": social_profiles,
+    }
+
+
 async def fetch_full_profile(user_id: int) -> Dict[str, Any]:
     """
     Fetch comprehensive athlete profile from GMTM database.
 
+    Queries the database directly; the MCP agent is only used if that fails.
+
     Args:
         user_id: The athlete's user_id
 
@@ -117,48 +218,64 @@ async def fetch_full_profile(user_id: int) -> Dict[str, Any]:
         FullAthleteProfile-compatible dict
     """
     try:
-        prompt = PROFILE_FETCH_PROMPT.format(user_id=user_id)
+        data = await asyncio.to_thread(_fetch_profile_sql, user_id)
+        if data:
+            return transform_to_profile_response(data, user_id)
+    except Exception as e:
+        logger.warning("Direct profile query failed, falling back to MCP: %s", e)
+
+    return await _fetch_full_profile_mcp(user_id)
 
-        options = ClaudeAgentOptions(
-            mcp_servers=str(MCP_CONFIG_PATH),
-            allowed_tools=[
-                "mcp__gmtmmcp__run_sql",
-                "mcp__gmtmmcp__get_table_schema"
-            ],
-            permission_mode="bypassPermissions",
-            max_turns=8,
-            model="claude-sonnet-4-20250514",
-            cwd=str(MCP_CONFIG_PATH.parent)
-        )
+
+async def _fetch_full_profile_mcp(user_id: int) -> Dict[str, Any]:
+    """Fetch the profile by having Claude run the queries through GMTM MCP."""
+    try:
+        prompt = PROFILE_FETCH_PROMPT.format(user_id=user_id)
 
         full_response = ""
 
-        async for message in query(prompt=prompt, options=options):
+        async for message in query(prompt=prompt, options=PROFILE_FETCH_OPTIONS):
             if isinstance(message, AssistantMessage):
                 for block in message.content:
                     if isinstance(block, TextBlock):
                         full_response += block.text
 
         # Parse the JSON response
-        json_match = re.search(r'\{[\s\S]*"profile"[\s\S]*\}', full_response)
-        if json_match:
-            data = json.loads(json_match.group())
+        data = _extract_profile_json(full_response)
+        if data:
             return transform_to_profile_response(data, user_id)
 
         # Fallback if no JSON found
         return create_minimal_profile(user_id)
 
     except Exception as e:
-        print(f"Profile fetch error: {e}")
+        logger.error("Profile fetch error: %s", e)
         return create_minimal_profile(user_id)
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_profile_json(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in text that has a "profile" key, scanned without regex backtracking."""
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, idx)
+            if isinstance(obj, dict) and "profile" in obj:
+                return obj
+        except json.JSONDecodeError:
+            pass
+        idx = text.find("{", idx + 1)
+    return None
+
+
 def transform_to_profile_response(data: Dict, user_id: int) -> Dict[str, Any]:
     """Transform raw query results to FullAthleteProfile format."""
     profile = data.get("profile", {})
 
-    first_name = profile.get("first_name", "Unknown")
-    last_name = profile.get("last_name", "")
+    first_name = profile.get("first_name") or "Unknown"
+    last_name = profile.get("last_name") or ""
     slug = f"{first_name.lower()}-{last_name.lower()}".replace(" ", "-")
 
     # Transform metrics
@@ -193,13 +310,13 @@ def transform_to_profile_response(data: Dict, user_id: int) -> Dict[str, Any]:
     # Transform social profiles
     social_profiles = []
     for s in data.get("social_profiles", []):
-        platform = s.get("platform", s.get("name", "")).lower()
-        handle = s.get("handle", s.get("uri", ""))
+        platform = (s.get("platform") or s.get("name") or "").lower()
+        handle = s.get("handle") or s.get("uri") or ""
 
         if platform and handle:
-            url_pattern = SOCIAL_URL_PATTERNS.get(platform)
-            if url_pattern:
-                url = url_pattern.format(handle=handle)
+            build_url = SOCIAL_URL_BUILDERS.get(platform)
+            if build_url:
+                url = build_url(handle)
             elif handle.startswith("http"):
                 url = handle
             else:
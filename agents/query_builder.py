@@ -7,7 +7,10 @@ Handles metric normalization, position mappings, and state abbreviations.
 """
 
 import re
-from typing import Dict, List, Optional, Tuple, Any
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple, Any
 from dataclasses import dataclass
 
 # ============================================
@@ -15,7 +18,7 @@ from dataclasses import dataclass
 # ============================================
 
 # Maps natural language metric names to exact database titles
-METRIC_MAPPINGS: Dict[str, str] = {
+METRIC_MAPPINGS: Mapping[str, str] = {
     # 40-yard dash variations
     "40": "40 Yard Dash",
     "40 yard": "40 Yard Dash",
@@ -83,21 +86,35 @@ METRIC_MAPPINGS: Dict[str, str] = {
     "act": "ACT",
 }
 
+# Lookup tables are read-only; interned keys/titles let dict hits short-circuit
+# on identity instead of comparing characters
+METRIC_MAPPINGS = MappingProxyType(
+    {sys.intern(k): sys.intern(v) for k, v in METRIC_MAPPINGS.items()}
+)
+
+# Every METRIC_MAPPINGS phrase in one alternation, longest first so "40 yard dash"
+# wins over "40". Lookarounds keep "40" from matching inside "4.40" or "140".
+METRIC_PATTERN = re.compile(
+    r"(?<![\w.])(" + "|".join(
+        re.escape(k) for k in sorted(METRIC_MAPPINGS, key=len, reverse=True)
+    ) + r")(?![\w.])"
+)
+
 # Metrics where lower is better (for sorting)
-LOWER_IS_BETTER = {
+LOWER_IS_BETTER: FrozenSet[str] = frozenset({
     "40 Yard Dash",
     "5-10-5 shuttle",
     "20 Yard Shuttle",
     "100 Meter Dash",
     "Speed",
-}
+})
 
 # ============================================
 # POSITION MAPPINGS
 # ============================================
 
 # Maps position names/abbreviations to position_ids
-POSITION_MAPPINGS: Dict[str, List[int]] = {
+POSITION_MAPPINGS: Mapping[str, List[int]] = {
     # Football - Offense
     "quarterback": [211, 240, 302, 327],
     "qb": [211, 240, 302, 327],
@@ -164,11 +181,27 @@ POSITION_MAPPINGS: Dict[str, List[int]] = {
     "dual": [212, 241],
 }
 
+POSITION_MAPPINGS = MappingProxyType(
+    {sys.intern(k): v for k, v in POSITION_MAPPINGS.items()}
+)
+
+# Whitespace-free aliases so "runningback" or "tightend" still resolve
+POSITION_COMPACT: Dict[str, List[int]] = {
+    re.sub(r'\s+', '', k): v for k, v in POSITION_MAPPINGS.items()
+}
+
+# Reverse lookup; the first (full) name listed for an id wins over its abbreviation
+POSITION_ID_TO_NAME: Dict[int, str] = {}
+for _name, _ids in POSITION_MAPPINGS.items():
+    for _id in _ids:
+        POSITION_ID_TO_NAME.setdefault(_id, _name)
+del _name, _ids, _id
+
 # ============================================
 # STATE MAPPINGS
 # ============================================
 
-STATE_MAPPINGS: Dict[str, str] = {
+STATE_MAPPINGS: Mapping[str, str] = {
     # Full names to abbreviations
     "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR",
     "california": "CA", "colorado": "CO", "connecticut": "CT", "delaware": "DE",
@@ -202,11 +235,15 @@ STATE_MAPPINGS: Dict[str, str] = {
     "on": "ON", "qc": "QC", "bc": "BC", "ab": "AB", "mb": "MB", "sk": "SK",
 }
 
+STATE_MAPPINGS = MappingProxyType(
+    {sys.intern(k): sys.intern(v) for k, v in STATE_MAPPINGS.items()}
+)
+
 # ============================================
 # SPORT MAPPINGS
 # ============================================
 
-SPORT_MAPPINGS: Dict[str, int] = {
+SPORT_MAPPINGS: Mapping[str, int] = {
     "football": 1,
     "american football": 1,
     "basketball": 2,
@@ -233,11 +270,137 @@ SPORT_MAPPINGS: Dict[str, int] = {
     "rugby": 21,
 }
 
+SPORT_MAPPINGS = MappingProxyType(
+    {sys.intern(k): v for k, v in SPORT_MAPPINGS.items()}
+)
+
+# ============================================
+# COMBINED LOOKUP
+# ============================================
+
+# Every mapping key in one dict so an unknown token is classified with a single
+# probe. Some keys belong to several tables ("de" is Delaware and defensive
+# end), so each entry holds all (kind, value) matches.
+_ALL_MAPPINGS: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+for _kind, _table in (
+    ("metric", METRIC_MAPPINGS),
+    ("position", POSITION_MAPPINGS),
+    ("state", STATE_MAPPINGS),
+    ("sport", SPORT_MAPPINGS),
+):
+    for _key, _value in _table.items():
+        _ALL_MAPPINGS[_key] = _ALL_MAPPINGS.get(_key, ()) + ((_kind, _value),)
+del _kind, _table, _key, _value
+
+# ============================================
+# PARSER PATTERNS
+# ============================================
+
+# Compiled once at import rather than looked up in re's cache on every parse
+_METRIC_COND_RE = re.compile(
+    # sub-X.X metric
+    r'sub[- ]?(?P<sub_val>\d+\.?\d*)\s*(?:second)?\s*(?P<sub>40|forty|vert|vertical|shuttle)'
+    # under/below X.X metric
+    r'|(?:under|below)\s+(?P<under_val>\d+\.?\d*)\s*(?:second|s|inch|in)?\s*(?P<under>40|forty|vert|vertical|shuttle|bench)'
+    # over/above X metric
+    r'|(?:over|above)\s+(?P<over_val>\d+\.?\d*)\s*(?:inch|in|"|\')?\s*(?P<over>vert|vertical|broad|bench|height|weight)'
+    # X.X 40/shuttle or better (for time metrics)
+    r'|(?P<better_val>\d+\.?\d*)\s*(?P<better>40|forty|shuttle|5-10-5)\s*(?:or better|or less)'
+)
+_METRIC_COND_OPERATORS = {"sub": "<", "under": "<", "over": ">", "better": "<="}
+
+# Every _METRIC_COND_RE branch needs one of these keywords ("vert" covers
+# "vertical"), so text without any of them can skip the regex entirely
+_METRIC_COND_KEYWORDS = ("40", "forty", "vert", "shuttle", "5-10-5", "bench", "broad", "height", "weight")
+
+# Checked in priority order, not leftmost-first: "2026 ... class of 2027"
+# must read as 2027
+_GRAD_YEAR_PATTERNS = (
+    re.compile(r'class\s+of\s+(\d{4})'),
+    re.compile(r'(?:graduating|grad)\s+(\d{4})'),
+    re.compile(r'(\d{4})\s+(?:class|athletes?|recruits?)'),
+    re.compile(r'\b(202[4-9]|2030)\b'),
+)
+
+# State names match in lowercased text, longest first so "west virginia" beats
+# "virginia". Two-letter codes only match when written in capitals, otherwise
+# words like "in", "or" and "me" would read as states.
+_STATE_NAME_RE = re.compile(
+    r'\b(' + "|".join(
+        re.escape(k) for k in sorted(
+            (k for k in STATE_MAPPINGS if len(k) > 2), key=len, reverse=True
+        )
+    ) + r')\b'
+)
+_STATE_ABBREV_RE = re.compile(
+    r'\b(' + "|".join(k.upper() for k in STATE_MAPPINGS if len(k) == 2) + r')\b'
+)
+
+# Intent signatures: query text is split into words/numbers, comparison words
+# collapse to operators and filler words are dropped
+_SIGNATURE_TOKEN_RE = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+_SIGNATURE_OPERATORS = {
+    "sub": "<", "under": "<", "below": "<", "faster": "<",
+    "over": ">", "above": ">", "at least": ">=", "or better": "<=", "or less": "<=",
+}
+_SIGNATURE_STOPWORDS = frozenset({
+    "a", "an", "the", "with", "of", "for", "in", "from", "at", "me", "show",
+    "find", "get", "give", "list", "search", "who", "that", "have", "has",
+    "is", "are", "any", "inch", "inches", "second", "seconds", "sec", "s",
+    "class", "grad", "graduating", "recruits", "recruit", "players", "player",
+    "prospects", "kids",
+})
+
+# Maps every character except a-z / 0-9 to '_' (input is lowercased first);
+# non-ASCII falls through to __missing__ so it is replaced too
+class _AliasTable(dict):
+    def __missing__(self, codepoint: int) -> int:
+        return ord('_')
+
+
+_ALIAS_TABLE = _AliasTable(
+    {ord(c): ord(c) for c in 'abcdefghijklmnopqrstuvwxyz0123456789'}
+)
+
+
+@lru_cache(maxsize=256)
+def _make_alias(metric_name: str) -> str:
+    """SQL-safe alias for a metric name; the set of names is small, so memoize"""
+    return metric_name.lower().translate(_ALIAS_TABLE)[:20]
+
+# ============================================
+# SQL SKELETON
+# ============================================
+
+# Invariant part of the athlete search query, joined once at import
+_BASE_SELECT = ", ".join([
+    "u.user_id",
+    "u.first_name",
+    "u.last_name",
+    "u.graduation_year",
+    "u.avatar_uri",
+    "l.city",
+    "l.province",
+    "l.country",
+    "p.name as position_name",
+    "s.name as sport_name",
+    "(SELECT COUNT(*) FROM film f WHERE f.user_id = u.user_id AND f.visibility = 2) as film_count",
+])
+
+_BASE_FROM = (
+    "\nFROM users u"
+    "\nJOIN locations l ON u.location_id = l.location_id"
+    "\nLEFT JOIN career c ON u.user_id = c.user_id AND c.is_current = 1 AND c.visibility = 1"
+    "\nLEFT JOIN user_positions up ON c.career_id = up.career_id"
+    "\nLEFT JOIN positions p ON up.position_id = p.position_id"
+    "\nLEFT JOIN sports s ON c.sport_id = s.sport_id\n"
+)
+
 # ============================================
 # DATA CLASSES
 # ============================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MetricFilter:
     """Represents a metric filter condition"""
     metric_name: str  # Database title
@@ -246,7 +409,7 @@ class MetricFilter:
     alias: str  # For SQL alias
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SearchFilters:
     """Parsed search filters from natural language"""
     metrics: List[MetricFilter]
@@ -257,6 +420,21 @@ class SearchFilters:
     limit: int = 10
     verified_only: bool = False
 
+    def shape_key(self) -> Tuple:
+        """
+        Hashable description of which filters are present. Everything that
+        changes the SQL text is in here; values that are bound as parameters
+        (state, year, sport, position ids, thresholds, limit) are not.
+        """
+        return (
+            tuple((m.metric_name, m.operator, m.alias) for m in self.metrics),
+            len(self.positions),
+            bool(self.state),
+            bool(self.graduation_year),
+            bool(self.sport_id),
+            self.verified_only,
+        )
+
 
 # ============================================
 # QUERY BUILDER CLASS
@@ -273,6 +451,19 @@ class QueryBuilder:
         metric_lower = metric.lower().strip()
         return METRIC_MAPPINGS.get(metric_lower)
 
+    def _normalize_metric_fast(self, metric_lower: str) -> Optional[str]:
+        """normalize_metric for input that is already lowercased and stripped"""
+        return METRIC_MAPPINGS.get(metric_lower)
+
+    def find_metrics(self, text: str, text_lower: Optional[str] = None) -> List[str]:
+        """Database titles of every metric mentioned in free text, in order, single pass"""
+        found = []
+        for match in METRIC_PATTERN.finditer(text_lower if text_lower is not None else text.lower()):
+            title = METRIC_MAPPINGS[match.group(1)]
+            if title not in found:
+                found.append(title)
+        return found
+
     def normalize_state(self, state: str) -> Optional[str]:
         """Convert state name/abbrev to standard abbreviation"""
         state_lower = state.lower().strip()
@@ -281,225 +472,293 @@ class QueryBuilder:
     def normalize_position(self, position: str) -> List[int]:
         """Convert position name to list of position IDs"""
         position_lower = position.lower().strip()
-        return POSITION_MAPPINGS.get(position_lower, [])
+        ids = POSITION_MAPPINGS.get(position_lower)
+        if ids is None:
+            ids = POSITION_COMPACT.get(re.sub(r'\s+', '', position_lower), [])
+        return ids
+
+    def position_name(self, position_id: int) -> Optional[str]:
+        """Convert a position_id back to its position name"""
+        return POSITION_ID_TO_NAME.get(position_id)
+
+    def classify(self, token: str) -> Tuple[Tuple[str, Any], ...]:
+        """Every (kind, value) a token maps to across metric/position/state/sport tables"""
+        return _ALL_MAPPINGS.get(token.lower().strip(), ())
 
     def normalize_sport(self, sport: str) -> Optional[int]:
         """Convert sport name to sport_id"""
         sport_lower = sport.lower().strip()
         return SPORT_MAPPINGS.get(sport_lower)
 
-    def parse_metric_condition(self, text: str) -> Optional[MetricFilter]:
+    def parse_text(self, text: str) -> Dict[str, Any]:
+        """Run every free-text parser over one query, lowercasing it only once"""
+        text_lower = text.lower()
+        return {
+            "metrics": self.find_metrics(text, text_lower),
+            "metric_condition": self.parse_metric_condition(text, text_lower),
+            "graduation_year": self.parse_graduation_year(text, text_lower),
+            "state": self.extract_state(text, text_lower),
+        }
+
+    def extract_state(self, text: str, text_lower: Optional[str] = None) -> Optional[str]:
+        """State/province abbreviation mentioned in free text, in one scan"""
+        if text_lower is None:
+            text_lower = text.lower()
+
+        match = _STATE_NAME_RE.search(text_lower)
+        if match:
+            return STATE_MAPPINGS[match.group(1)]
+
+        match = _STATE_ABBREV_RE.search(text)
+        if match:
+            return STATE_MAPPINGS[match.group(1).lower()]
+
+        return None
+
+    def parse_to_signature(self, text: str) -> Optional[Tuple]:
+        """
+        Canonical, order-independent description of what a search asks for,
+        so paraphrases ("RBs in Texas sub 4.5 40" / "sub-4.5 forty running
+        backs from TX") share one cache key. Returns None for empty text.
+
+        Nothing is discarded except filler words: phrases found in the mapping
+        tables become their (kind, value), numbers become floats and any
+        other word is kept as-is. A phrase this cannot canonicalize only
+        costs a cache miss, never a wrong hit.
+        """
+        tokens = _SIGNATURE_TOKEN_RE.findall(text.lower())
+        capitals = set(_STATE_ABBREV_RE.findall(text))
+        items = []
+
+        i = 0
+        while i < len(tokens):
+            # Longest phrase first: "40 yard dash", "5-10-5", "running backs"
+            for size in (3, 2, 1):
+                phrase = tokens[i:i + size]
+                if len(phrase) < size:
+                    continue
+                spaced, hyphenated = " ".join(phrase), "-".join(phrase)
+                if spaced in _SIGNATURE_OPERATORS:
+                    items.append(("op", _SIGNATURE_OPERATORS[spaced]))
+                    break
+                matches = _ALL_MAPPINGS.get(spaced) or _ALL_MAPPINGS.get(hyphenated)
+                if not matches and spaced.endswith("s"):
+                    matches = _ALL_MAPPINGS.get(spaced[:-1])
+                # Lowercase two-letter words ("in", "or", "ok") are not states
+                if matches and len(spaced) == 2 and spaced.upper() not in capitals:
+                    matches = tuple(m for m in matches if m[0] != "state")
+                if matches:
+                    items.append(tuple(
+                        (kind, tuple(value) if isinstance(value, list) else value)
+                        for kind, value in matches
+                    ))
+                    break
+            else:
+                size = 1
+                token = tokens[i]
+                if token[0].isdigit():
+                    items.append(("num", float(token)))
+                elif token not in _SIGNATURE_STOPWORDS:
+                    items.append(("term", token))
+            i += size
+
+        if not items:
+            return None
+
+        # With a single operator/number/metric there is only one way to pair
+        # them, so word order is irrelevant. With several ("sub 4.5 40 and
+        # over 36 vertical") the order carries the pairing and is kept.
+        metric_items = sum(
+            1 for item in items
+            if isinstance(item[0], tuple) and any(kind == "metric" for kind, _ in item)
+        )
+        if (
+            sum(item[0] == "op" for item in items) <= 1
+            and sum(item[0] == "num" for item in items) <= 1
+            and metric_items <= 1
+        ):
+            return tuple(sorted(set(items), key=repr))
+        return tuple(items)
+
+    def parse_metric_condition(self, text: str, text_lower: Optional[str] = None) -> Optional[MetricFilter]:
         """
         Parse a metric condition from text.
+        Pass text_lower when the caller already has the lowercased text.
 
         Examples:
             "sub-4.5 40" -> MetricFilter("40 Yard Dash", "<", 4.5)
             "over 35 inch vertical" -> MetricFilter("Vertical Jump", ">", 35)
             "4.0 shuttle or better" -> MetricFilter("5-10-5 shuttle", "<", 4.0)
         """
-        text_lower = text.lower()
-
-        # Pattern: sub-X.X metric
-        sub_pattern = r'sub[- ]?(\d+\.?\d*)\s*(?:second)?\s*(40|forty|vert|vertical|shuttle)'
-        match = re.search(sub_pattern, text_lower)
-        if match:
-            value = float(match.group(1))
-            metric_key = match.group(2)
-            metric_name = self.normalize_metric(metric_key)
-            if metric_name:
-                return MetricFilter(
-                    metric_name=metric_name,
-                    operator="<",
-                    value=value,
-                    alias=self._make_alias(metric_name)
-                )
-
-        # Pattern: under/below X.X metric
-        under_pattern = r'(?:under|below)\s+(\d+\.?\d*)\s*(?:second|s|inch|in)?\s*(40|forty|vert|vertical|shuttle|bench)'
-        match = re.search(under_pattern, text_lower)
-        if match:
-            value = float(match.group(1))
-            metric_key = match.group(2)
-            metric_name = self.normalize_metric(metric_key)
-            if metric_name:
-                return MetricFilter(
-                    metric_name=metric_name,
-                    operator="<",
-                    value=value,
-                    alias=self._make_alias(metric_name)
-                )
-
-        # Pattern: over/above X metric
-        over_pattern = r'(?:over|above)\s+(\d+\.?\d*)\s*(?:inch|in|"|\')?\s*(vert|vertical|broad|bench|height|weight)'
-        match = re.search(over_pattern, text_lower)
-        if match:
-            value = float(match.group(1))
-            metric_key = match.group(2)
-            metric_name = self.normalize_metric(metric_key)
-            if metric_name:
-                return MetricFilter(
-                    metric_name=metric_name,
-                    operator=">",
-                    value=value,
-                    alias=self._make_alias(metric_name)
-                )
-
-        # Pattern: X.X 40/shuttle or better (for time metrics)
-        better_pattern = r'(\d+\.?\d*)\s*(40|forty|shuttle|5-10-5)\s*(?:or better|or less)'
-        match = re.search(better_pattern, text_lower)
-        if match:
-            value = float(match.group(1))
-            metric_key = match.group(2)
-            metric_name = self.normalize_metric(metric_key)
+        if text_lower is None:
+            text_lower = text.lower()
+
+        # Substring checks run in C and rule out most text before the regex
+        if not any(keyword in text_lower for keyword in _METRIC_COND_KEYWORDS):
+            return None
+
+        # One scan covers all four phrasings; the named group that matched
+        # says which one it was
+        for match in _METRIC_COND_RE.finditer(text_lower):
+            kind = match.lastgroup
+            metric_name = self._normalize_metric_fast(match.group(kind))
             if metric_name:
                 return MetricFilter(
                     metric_name=metric_name,
-                    operator="<=",
-                    value=value,
+                    operator=_METRIC_COND_OPERATORS[kind],
+                    value=float(match.group(kind + "_val")),
                     alias=self._make_alias(metric_name)
                 )
 
         return None
 
-    def parse_graduation_year(self, text: str) -> Optional[int]:
+    def parse_graduation_year(self, text: str, text_lower: Optional[str] = None) -> Optional[int]:
         """Extract graduation year from text"""
-        text_lower = text.lower()
-
-        # Pattern: class of 20XX
-        match = re.search(r'class\s+of\s+(\d{4})', text_lower)
-        if match:
-            return int(match.group(1))
-
-        # Pattern: graduating 20XX
-        match = re.search(r'(?:graduating|grad)\s+(\d{4})', text_lower)
-        if match:
-            return int(match.group(1))
-
-        # Pattern: 20XX class/athletes/recruits
-        match = re.search(r'(\d{4})\s+(?:class|athletes?|recruits?)', text_lower)
-        if match:
-            return int(match.group(1))
+        if text_lower is None:
+            text_lower = text.lower()
 
-        # Pattern: standalone year (2024-2030 range)
-        match = re.search(r'\b(202[4-9]|2030)\b', text_lower)
-        if match:
-            return int(match.group(1))
+        # "class of 20XX" / "graduating 20XX" / "20XX recruits" / bare 2024-2030
+        for pattern in _GRAD_YEAR_PATTERNS:
+            match = pattern.search(text_lower)
+            if match:
+                return int(match.group(1))
 
         return None
 
     def _make_alias(self, metric_name: str) -> str:
         """Create SQL-safe alias from metric name"""
-        return re.sub(r'[^a-zA-Z0-9]', '_', metric_name.lower())[:20]
+        return _make_alias(metric_name)
 
     def build_athlete_search_query(
         self,
         filters: SearchFilters,
         include_metrics: Optional[List[str]] = None
-    ) -> str:
+    ) -> Tuple[str, List[Any]]:
         """
         Build a complete SQL query for athlete search.
 
+        Filter values are bound as %s placeholders rather than interpolated,
+        so the query text only varies with the shape of the filters.
+
         Args:
             filters: Parsed search filters
             include_metrics: Additional metrics to include in SELECT
 
         Returns:
-            SQL query string
+            (SQL query string, parameters in placeholder order)
         """
-        # Base SELECT clause
-        select_parts = [
-            "u.user_id",
-            "u.first_name",
-            "u.last_name",
-            "u.graduation_year",
-            "u.avatar_uri",
-            "l.city",
-            "l.province",
-            "l.country",
-            "p.name as position_name",
-            "s.name as sport_name",
-            "(SELECT COUNT(*) FROM film f WHERE f.user_id = u.user_id AND f.visibility = 2) as film_count"
-        ]
-
-        # Metric JOINs and SELECTs
-        metric_joins = []
-        for mf in filters.metrics:
-            join = f"""
-LEFT JOIN metrics m_{mf.alias} ON u.user_id = m_{mf.alias}.user_id
-    AND m_{mf.alias}.title = '{mf.metric_name}'
-    AND m_{mf.alias}.is_current = 1"""
-            metric_joins.append(join)
-            select_parts.append(f"m_{mf.alias}.value as {mf.alias}")
-
-        # Include additional metrics if requested
-        if include_metrics:
-            for metric_name in include_metrics:
-                alias = self._make_alias(metric_name)
-                if not any(mf.alias == alias for mf in filters.metrics):
-                    join = f"""
-LEFT JOIN metrics m_{alias} ON u.user_id = m_{alias}.user_id
-    AND m_{alias}.title = '{metric_name}'
-    AND m_{alias}.is_current = 1"""
-                    metric_joins.append(join)
-                    select_parts.append(f"m_{alias}.value as {alias}")
+        # The SQL text is built once per filter shape; only params vary per call
+        sql, included_titles = _search_query_template(
+            filters.shape_key(),
+            tuple(include_metrics) if include_metrics else ()
+        )
+
+        # Params in placeholder order: JOIN titles, WHERE values, LIMIT
+        params: List[Any] = [mf.metric_name for mf in filters.metrics]
+        params.extend(included_titles)
+        if filters.state:
+            params.append(filters.state)
+        if filters.graduation_year:
+            params.append(filters.graduation_year)
+        if filters.sport_id:
+            params.append(filters.sport_id)
+        params.extend(filters.positions)
+        params.extend(mf.value for mf in filters.metrics)
+        params.append(filters.limit)
+        return sql, params
 
-        # Build WHERE clause
-        where_parts = [
-            "u.type = 1",  # Athletes only
-            "u.visibility = 2"  # Public profiles
-        ]
 
-        # State filter
-        if filters.state:
-            where_parts.append(f"l.province = '{filters.state}'")
+@lru_cache(maxsize=512)
+def _search_query_template(shape: Tuple, include_metrics: Tuple[str, ...]) -> Tuple[str, Tuple[str, ...]]:
+    """
+    SQL text for one SearchFilters.shape_key(), plus the include_metrics
+    titles that were actually joined (their params follow the filter metrics').
+    """
+    metrics, position_count, has_state, has_year, has_sport, verified_only = shape
 
-        # Graduation year filter
-        if filters.graduation_year:
-            where_parts.append(f"u.graduation_year = {filters.graduation_year}")
+    # Base SELECT clause; only metric columns are appended per query
+    select_parts = [_BASE_SELECT]
 
-        # Sport filter
-        if filters.sport_id:
-            where_parts.append(f"c.sport_id = {filters.sport_id}")
-
-        # Position filter
-        if filters.positions:
-            pos_list = ",".join(str(p) for p in filters.positions)
-            where_parts.append(f"up.position_id IN ({pos_list})")
-
-        # Metric filters
-        for mf in filters.metrics:
-            where_parts.append(
-                f"CAST(m_{mf.alias}.value AS DECIMAL(10,2)) {mf.operator} {mf.value}"
-            )
-
-        # Verified only filter
-        if filters.verified_only:
-            for mf in filters.metrics:
-                where_parts.append(f"m_{mf.alias}.verified = 1")
-
-        # Build ORDER BY (sort by first metric if exists)
-        order_by = ""
-        if filters.metrics:
-            first_metric = filters.metrics[0]
-            direction = "ASC" if first_metric.metric_name in LOWER_IS_BETTER else "DESC"
-            order_by = f"ORDER BY CAST(m_{first_metric.alias}.value AS DECIMAL(10,2)) {direction}"
-
-        # Assemble query
-        query = f"""
-SELECT DISTINCT
-    {', '.join(select_parts)}
-FROM users u
-JOIN locations l ON u.location_id = l.location_id
-LEFT JOIN career c ON u.user_id = c.user_id AND c.is_current = 1 AND c.visibility = 1
-LEFT JOIN user_positions up ON c.career_id = up.career_id
-LEFT JOIN positions p ON up.position_id = p.position_id
-LEFT JOIN sports s ON c.sport_id = s.sport_id
-{chr(10).join(metric_joins)}
-WHERE {' AND '.join(where_parts)}
-{order_by}
-LIMIT {filters.limit}
-"""
-        return query.strip()
+    # Metric JOINs and SELECTs
+    metric_joins = []
+    for metric_name, operator, alias in metrics:
+        join = f"""
+LEFT JOIN metrics m_{alias} ON u.user_id = m_{alias}.user_id
+    AND m_{alias}.title = %s
+    AND m_{alias}.is_current = 1"""
+        metric_joins.append(join)
+        select_parts.append(f"m_{alias}.value as {alias}")
+
+    # Include additional metrics if requested
+    included_titles = []
+    if include_metrics:
+        existing_aliases = {alias for _, _, alias in metrics}
+        for metric_name in include_metrics:
+            alias = _make_alias(metric_name)
+            if alias not in existing_aliases:
+                existing_aliases.add(alias)
+                join = f"""
+LEFT JOIN metrics m_{alias} ON u.user_id = m_{alias}.user_id
+    AND m_{alias}.title = %s
+    AND m_{alias}.is_current = 1"""
+                metric_joins.append(join)
+                included_titles.append(metric_name)
+                select_parts.append(f"m_{alias}.value as {alias}")
+
+    # Build WHERE clause
+    where_parts = [
+        "u.type = 1",  # Athletes only
+        "u.visibility = 2"  # Public profiles
+    ]
+
+    # State filter
+    if has_state:
+        where_parts.append("l.province = %s")
+
+    # Graduation year filter
+    if has_year:
+        where_parts.append("u.graduation_year = %s")
+
+    # Sport filter
+    if has_sport:
+        where_parts.append("c.sport_id = %s")
+
+    # Position filter
+    if position_count:
+        pos_list = ",".join(["%s"] * position_count)
+        where_parts.append(f"up.position_id IN ({pos_list})")
+
+    # Metric filters
+    for metric_name, operator, alias in metrics:
+        where_parts.append(
+            f"CAST(m_{alias}.value AS DECIMAL(10,2)) {operator} %s"
+        )
+
+    # Verified only filter
+    if verified_only:
+        for metric_name, operator, alias in metrics:
+            where_parts.append(f"m_{alias}.verified = 1")
+
+    # Build ORDER BY (sort by first metric if exists)
+    order_by = ""
+    if metrics:
+        first_name, _, first_alias = metrics[0]
+        direction = "ASC" if first_name in LOWER_IS_BETTER else "DESC"
+        order_by = f"ORDER BY CAST(m_{first_alias}.value AS DECIMAL(10,2)) {direction}"
+
+    # Assemble query from parts in one join
+    parts = [
+        "SELECT DISTINCT\n    ",
+        ", ".join(select_parts),
+        _BASE_FROM,
+        "\n".join(metric_joins),
+        "\nWHERE ",
+        " AND ".join(where_parts),
+        "\n",
+        order_by,
+        "\nLIMIT %s",
+    ]
+    return "".join(parts).strip(), tuple(included_titles)
 
 
 # ============================================
@@ -514,7 +773,7 @@ def build_search_query(
     metric_filters: Optional[List[Tuple[str, str, float]]] = None,
     limit: int = 10,
     verified_only: bool = False
-) -> str:
+) -> Tuple[str, List[Any]]:
     """
     Convenience function to build a search query.
 
@@ -528,7 +787,7 @@ def build_search_query(
         verified_only: Only verified metrics
 
     Returns:
-        SQL query string
+        (SQL query string, parameters in placeholder order)
     """
     builder = QueryBuilder()
 
@@ -569,7 +828,7 @@ def build_search_query(
 
 if __name__ == "__main__":
     # Test query building
-    query = build_search_query(
+    query, params = build_search_query(
         state="Texas",
         position="running back",
         metric_filters=[
@@ -580,3 +839,4 @@ if __name__ == "__main__":
     )
     print("Generated Query:")
     print(query)
+    print("Params:", params)
@@ -15,8 +15,11 @@ Features:
 import os
 import re
 import json
+from collections import deque
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+
+from cachetools import TTLCache
 
 # Claude Agent SDK imports
 from claude_agent_sdk import query, ClaudeAgentOptions
@@ -188,6 +191,220 @@ After running the SQL query, return results in this EXACT JSON format:
 6. Focus on verified=1 metrics from SPARQ events
 """
 
+SQL_TOOL = "mcp__gmtmmcp__run_sql"
+
+# (message, stage) of the tool_start event for each allowed tool; looked up
+# once per tool call in search_streaming
+TOOL_EVENT_LABELS: Dict[str, Tuple[str, str]] = {
+    SQL_TOOL: ("Querying athlete database...", "querying"),
+    "mcp__gmtmmcp__get_table_schema": ("Analyzing database structure...", "analyzing"),
+    "mcp__gmtmmcp__get_full_schema": ("Analyzing database structure...", "analyzing"),
+}
+
+# SCOUT_AGENT_PROMPT goes in as the system prompt so the same prefix is sent
+# byte-for-byte on every search and is served from the prompt cache; only the
+# request below varies per call
+SCOUT_AGENT_OPTIONS = ClaudeAgentOptions(
+    system_prompt=SCOUT_AGENT_PROMPT,
+    mcp_servers=str(MCP_CONFIG_PATH),
+    allowed_tools=[
+        "mcp__gmtmmcp__run_sql",
+        "mcp__gmtmmcp__get_table_schema",
+        "mcp__gmtmmcp__get_full_schema"
+    ],
+    permission_mode="bypassPermissions",
+    max_turns=10,
+    model="claude-sonnet-4-20250514",
+    cwd=str(MCP_CONFIG_PATH.parent)
+)
+
+SEARCH_PROMPT_HEAD = "## Current Search Request\n"
+SEARCH_PROMPT_TAIL = """
+Please:
+1. Parse the query to identify filters (metrics, location, position, graduation year)
+2. Build and execute the SQL query using mcp__gmtmmcp__run_sql
+3. Return the results as JSON in the format specified in your instructions
+"""
+
+
+def build_search_prompt(natural_query: str, max_results: int) -> str:
+    """User prompt for one search request; the instructions live in SCOUT_AGENT_OPTIONS"""
+    return f'{SEARCH_PROMPT_HEAD}Coach query: "{natural_query}"\nMax results: {max_results}\n{SEARCH_PROMPT_TAIL}'
+
+
+# ============================================
+# SEARCH RESULT CACHE
+# ============================================
+
+# Exact tier: normalized query text -> result. Coaches repeat the same searches,
+# and athlete data does not move within the TTL.
+SEARCH_CACHE = TTLCache(maxsize=1024, ttl=15 * 60)
+
+# Intent tier: QueryBuilder.parse_to_signature -> (max_results, result). A
+# result fetched with a larger limit also answers any smaller one.
+INTENT_CACHE = TTLCache(maxsize=1024, ttl=15 * 60)
+QUERY_BUILDER = QueryBuilder()
+
+# Queries about "latest"/"today" must always reach the database
+VOLATILE_SEARCH_TERMS = frozenset({"today", "latest", "recent", "newest", "now", "new"})
+
+_SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def _search_tokens(natural_query: str) -> List[str]:
+    """Lowercased words/numbers; punctuation and spacing differences drop out"""
+    return _SEARCH_TOKEN_RE.findall(natural_query.lower())
+
+
+def _search_cache_key(tokens: List[str], max_results: int) -> Tuple:
+    return (" ".join(tokens), max_results)
+
+
+def get_cached_search(natural_query: str, max_results: int) -> Optional[Dict[str, Any]]:
+    """Cached result for this query or the same parsed intent, if any"""
+    tokens = _search_tokens(natural_query)
+    if VOLATILE_SEARCH_TERMS.intersection(tokens):
+        return None
+
+    result = SEARCH_CACHE.get(_search_cache_key(tokens, max_results))
+    if result is None:
+        result = _get_intent_result(natural_query, max_results)
+    if result is None:
+        return None
+    return {**result, "query": natural_query, "cached": True}
+
+
+def _get_intent_result(natural_query: str, max_results: int) -> Optional[Dict[str, Any]]:
+    signature = QUERY_BUILDER.parse_to_signature(natural_query)
+    entry = INTENT_CACHE.get(signature) if signature else None
+    if entry is None or entry[0] < max_results:
+        return None
+    athletes = entry[1].get("athletes", [])[:max_results]
+    return {**entry[1], "athletes": athletes, "athletes_found": len(athletes)}
+
+
+def store_cached_search(natural_query: str, max_results: int, result: Dict[str, Any]) -> None:
+    """Remember a successful search for exact and intent lookups"""
+    if result.get("status") != "success":
+        return
+    tokens = _search_tokens(natural_query)
+    if VOLATILE_SEARCH_TERMS.intersection(tokens):
+        return
+    SEARCH_CACHE[_search_cache_key(tokens, max_results)] = result
+
+    signature = QUERY_BUILDER.parse_to_signature(natural_query)
+    if signature:
+        entry = INTENT_CACHE.get(signature)
+        if entry is None or entry[0] <= max_results:
+            INTENT_CACHE[signature] = (max_results, result)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_athletes_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    The JSON object holding "athletes" in the agent's reply. Decoding starts
+    from the nearest '{' before the key and walks outward, so the buffer is
+    never rescanned by a backtracking regex.
+    """
+    key_at = text.find('"athletes"')
+    if key_at == -1:
+        return None
+    idx = text.rfind("{", 0, key_at)
+    while idx != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, idx)
+            if isinstance(obj, dict) and "athletes" in obj:
+                return obj
+        except json.JSONDecodeError:
+            pass
+        idx = text.rfind("{", 0, idx)
+    return None
+
+
+class _ResponseWindow:
+    """
+    Keeps only the opening text of a reply (for summaries and debugging) and
+    its last few KB (where the athletes JSON lands), so memory per search stays
+    bounded however long the agent rambles. Tail chunks are never split, so a
+    single block holding the whole JSON always survives intact.
+    """
+
+    HEAD_CHARS = 4096
+    TAIL_CHARS = 16384
+
+    __slots__ = ("_head", "_head_len", "_tail", "_tail_len")
+
+    def __init__(self) -> None:
+        self._head: List[str] = []
+        self._head_len = 0
+        self._tail: deque = deque()
+        self._tail_len = 0
+
+    def append(self, chunk: str) -> None:
+        if self._head_len < self.HEAD_CHARS:
+            piece = chunk[:self.HEAD_CHARS - self._head_len]
+            self._head.append(piece)
+            self._head_len += len(piece)
+        self._tail.append(chunk)
+        self._tail_len += len(chunk)
+        while len(self._tail) > 1 and self._tail_len - len(self._tail[0]) >= self.TAIL_CHARS:
+            self._tail_len -= len(self._tail.popleft())
+
+    @property
+    def head(self) -> str:
+        return "".join(self._head)
+
+    @property
+    def tail(self) -> str:
+        return "".join(self._tail)
+
+
+class _AthleteStreamParser:
+    """
+    Pulls complete athlete objects out of the "athletes" array while the
+    reply is still arriving. Each feed() returns the athletes finished since
+    the last call; a partial object is left for the next chunk.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = -1  # index inside the athletes array, -1 until it is found
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self._done:
+            return []
+        self._text += chunk
+        if self._pos == -1:
+            key_at = self._text.find('"athletes"')
+            bracket = self._text.find("[", key_at) if key_at != -1 else -1
+            if bracket == -1:
+                return []
+            self._pos = bracket + 1
+
+        found = []
+        text = self._text
+        while True:
+            while self._pos < len(text) and text[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(text):
+                break
+            if text[self._pos] == "]":
+                self._done = True
+                break
+            try:
+                obj, self._pos = _JSON_DECODER.raw_decode(text, self._pos)
+            except json.JSONDecodeError:
+                break  # incomplete — wait for more text
+            if isinstance(obj, dict):
+                found.append(obj)
+        # Parsed text is never looked at again
+        self._text = text[self._pos:]
+        self._pos = 0
+        return found
+
 
 # ============================================
 # SCOUT AGENT CLASS
@@ -197,7 +414,8 @@ class ScoutAgent:
     """Scout AI Agent for talent discovery using Claude Agent SDK"""
 
     def __init__(self):
-        self.query_builder = QueryBuilder()
+        # QueryBuilder only holds read-only lookup tables, so every agent shares one
+        self.query_builder = QUERY_BUILDER
 
     async def search(
         self,
@@ -218,70 +436,40 @@ class ScoutAgent:
         """
         try:
             # Build the prompt for Claude
-            prompt = f"""
-{SCOUT_AGENT_PROMPT}
-
-## Current Search Request
-Coach query: "{natural_query}"
-Max results: {max_results}
-
-Please:
-1. Parse the query to identify filters (metrics, location, position, graduation year)
-2. Build and execute the SQL query using mcp__gmtmmcp__run_sql
-3. Return the results as JSON in the format specified above
-"""
-
-            # Configure agent options
-            options = ClaudeAgentOptions(
-                mcp_servers=str(MCP_CONFIG_PATH),
-                allowed_tools=[
-                    "mcp__gmtmmcp__run_sql",
-                    "mcp__gmtmmcp__get_table_schema",
-                    "mcp__gmtmmcp__get_full_schema"
-                ],
-                permission_mode="bypassPermissions",
-                max_turns=10,
-                model="claude-sonnet-4-20250514",
-                cwd=str(MCP_CONFIG_PATH.parent)
-            )
+            prompt = build_search_prompt(natural_query, max_results)
 
             # Run the agent and collect responses
-            full_response = ""
+            response = _ResponseWindow()
             tool_calls = []
 
-            async for message in query(prompt=prompt, options=options):
+            async for message in query(prompt=prompt, options=SCOUT_AGENT_OPTIONS):
                 if isinstance(message, AssistantMessage):
                     # Access content directly on AssistantMessage
                     for block in message.content:
                         if isinstance(block, TextBlock):
-                            full_response += block.text
+                            response.append(block.text)
                         elif isinstance(block, ToolUseBlock):
                             tool_calls.append({
                                 "tool": block.name if hasattr(block, 'name') else "unknown",
                                 "input": block.input if hasattr(block, 'input') else {}
                             })
-                elif isinstance(message, ResultMessage):
-                    # Handle result messages
-                    pass
+
+            head = response.head
 
             # Try to extract JSON from the response
             athletes = []
             summary = ""
 
             # Look for JSON in the response
-            json_match = re.search(r'\{[\s\S]*"athletes"[\s\S]*\}', full_response)
-            if json_match:
-                try:
-                    data = json.loads(json_match.group())
-                    athletes = data.get("athletes", [])
-                    summary = data.get("summary", f"Found {len(athletes)} athlete(s).")
-                except json.JSONDecodeError:
-                    pass
+            data = _extract_athletes_json(response.tail)
+            if data:
+                athletes = data.get("athletes", [])
+                summary = data.get("summary", f"Found {len(athletes)} athlete(s).")
 
             # If no JSON found, try to parse tabular results
             if not athletes:
                 # Extract summary from response
-                summary = full_response[:500] if full_response else "Search completed."
+                summary = head[:500] if head else "Search completed."
 
             return {
                 "status": "success",
@@ -290,7 +478,7 @@ Please:
                 "athletes": athletes,
                 "athletes_found": len(athletes),
                 "tool_calls": tool_calls,
-                "raw_response": full_response[:2000]  # For debugging
+                "raw_response": head[:2000]  # For debugging
             }
 
         except Exception as e:
@@ -324,18 +512,7 @@ Please:
 
         try:
             # Build the prompt for Claude
-            prompt = f"""
-{SCOUT_AGENT_PROMPT}
-
-## Current Search Request
-Coach query: "{natural_query}"
-Max results: {max_results}
-
-Please:
-1. Parse the query to identify filters (metrics, location, position, graduation year)
-2. Build and execute the SQL query using mcp__gmtmmcp__run_sql
-3. Return the results as JSON in the format specified above
-"""
+            prompt = build_search_prompt(natural_query, max_results)
 
             yield {
                 "event": "progress",
@@ -343,35 +520,29 @@ Please:
                 "stage": "connecting"
             }
 
-            # Configure agent options
-            options = ClaudeAgentOptions(
-                mcp_servers=str(MCP_CONFIG_PATH),
-                allowed_tools=[
-                    "mcp__gmtmmcp__run_sql",
-                    "mcp__gmtmmcp__get_table_schema",
-                    "mcp__gmtmmcp__get_full_schema"
-                ],
-                permission_mode="bypassPermissions",
-                max_turns=10,
-                model="claude-sonnet-4-20250514",
-                cwd=str(MCP_CONFIG_PATH.parent)
-            )
-
             # Run the agent and stream events
-            full_response = ""
+            response = _ResponseWindow()
+            athlete_parser = _AthleteStreamParser()
             tool_calls = []
             current_tool = None
 
-            async for message in query(prompt=prompt, options=options):
+            async for message in query(prompt=prompt, options=SCOUT_AGENT_OPTIONS):
                 if isinstance(message, AssistantMessage):
                     for block in message.content:
                         if isinstance(block, TextBlock):
-                            full_response += block.text
+                            response.append(block.text)
                             yield {
                                 "event": "thinking",
                                 "message": block.text[:100] + "..." if len(block.text) > 100 else block.text,
                                 "stage": "thinking"
                             }
+                            # Each athlete goes out as soon as its JSON object is complete
+                            for athlete in athlete_parser.feed(block.text):
+                                yield {
+                                    "event": "athlete",
+                                    "athlete": athlete,
+                                    "stage": "results"
+                                }
                         elif isinstance(block, ToolUseBlock):
                             tool_name = block.name if hasattr(block, 'name') else "unknown"
                             tool_input = block.input if hasattr(block, 'input') else {}
@@ -382,21 +553,17 @@ Please:
                             })
 
                             # Emit user-friendly tool events
-                            if "run_sql" in tool_name:
-                                yield {
+                            label = TOOL_EVENT_LABELS.get(tool_name)
+                            if label:
+                                event = {
                                     "event": "tool_start",
-                                    "message": "Querying athlete database...",
-                                    "stage": "querying",
-                                    "tool": tool_name,
-                                    "details": str(tool_input.get("query", ""))[:200] if isinstance(tool_input, dict) else ""
-                                }
-                            elif "schema" in tool_name:
-                                yield {
-                                    "event": "tool_start",
-                                    "message": "Analyzing database structure...",
-                                    "stage": "analyzing",
+                                    "message": label[0],
+                                    "stage": label[1],
                                     "tool": tool_name
                                 }
+                                if tool_name == SQL_TOOL:
+                                    event["details"] = str(tool_input.get("query", ""))[:200] if isinstance(tool_input, dict) else ""
+                                yield event
                             current_tool = tool_name
                 elif isinstance(message, ResultMessage):
                     if current_tool:
@@ -413,21 +580,19 @@ Please:
                 "stage": "processing"
             }
 
+            head = response.head
+
             # Try to extract JSON from the response
             athletes = []
             summary = ""
 
-            json_match = re.search(r'\{[\s\S]*"athletes"[\s\S]*\}', full_response)
-            if json_match:
-                try:
-                    data = json.loads(json_match.group())
-                    athletes = data.get("athletes", [])
-                    summary = data.get("summary", f"Found {len(athletes)} athlete(s).")
-                except json.JSONDecodeError:
-                    pass
+            data = _extract_athletes_json(response.tail)
+            if data:
+                athletes = data.get("athletes", [])
+                summary = data.get("summary", f"Found {len(athletes)} athlete(s).")
 
             if not athletes:
-                summary = full_response[:500] if full_response else "Search completed."
+                summary = head[:500] if head else "Search completed."
 
             # Yield final result
             yield {
@@ -463,6 +628,10 @@ Please:
 # MAIN EXECUTION FUNCTION
 # ============================================
 
+# ScoutAgent carries no per-search state, so one instance serves every request
+SCOUT_AGENT = ScoutAgent()
+
+
 async def run_scout_search(
     natural_query: str,
     user_id: Optional[int] = None,
@@ -479,8 +648,13 @@ async def run_scout_search(
     Returns:
         Search results dict
     """
-    agent = ScoutAgent()
-    return await agent.search(natural_query, user_id, max_results)
+    cached = get_cached_search(natural_query, max_results)
+    if cached is not None:
+        return cached
+
+    result = await SCOUT_AGENT.search(natural_query, user_id, max_results)
+    store_cached_search(natural_query, max_results, result)
+    return result
 
 
 async def run_scout_search_streaming(
@@ -492,8 +666,25 @@ async def run_scout_search_streaming(
     Run a Scout AI search with streaming events.
     Yields events for real-time UI updates.
     """
-    agent = ScoutAgent()
-    async for event in agent.search_streaming(natural_query, user_id, max_results):
+    cached = get_cached_search(natural_query, max_results)
+    if cached is not None:
+        # Replay the cached result as the events a live search would end with
+        yield {
+            "event": "start",
+            "message": "Analyzing your search request...",
+            "stage": "parsing"
+        }
+        yield {
+            "event": "complete",
+            "message": cached["response"],
+            "stage": "complete",
+            "result": cached
+        }
+        return
+
+    async for event in SCOUT_AGENT.search_streaming(natural_query, user_id, max_results):
+        if event.get("event") == "complete":
+            store_cached_search(natural_query, max_results, event["result"])
         yield event
 
 
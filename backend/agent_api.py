@@ -12,20 +12,42 @@ and returns results automatically within the same API response stream.
 query_database is a custom tool we handle ourselves (read-only GMTM MySQL).
 """
 
+import asyncio
+import hashlib
 import json
+import logging
 import os
+import re
+import threading
+import time
+from functools import lru_cache
 from typing import Optional
 
 import anthropic
+import orjson
 import pymysql
+from cachetools import TTLCache
+from dbutils.pooled_db import PooledDB
 from dotenv import load_dotenv
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env"))
-load_dotenv()
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# One client for the whole process so every chat reuses its HTTP connection
+# pool; the semaphore caps in-flight Claude calls to stay under rate limits.
+CLAUDE_CONCURRENCY = asyncio.Semaphore(20)
+_claude_client: Optional[anthropic.AsyncAnthropic] = None
+
+
+def _get_claude() -> anthropic.AsyncAnthropic:
+    global _claude_client
+    if _claude_client is None:
+        _claude_client = anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return _claude_client
 
 SYSTEM_PROMPT = """You are SPARQ's recruiting AI assistant. You help high school athletes navigate the college recruiting process with real, current intelligence.
 
@@ -60,9 +82,25 @@ When helping an athlete:
 - Address the athlete by name, cite their actual stats in your recommendations
 """
 
+# Static prefix sent as its own cache_control block so every turn reuses the
+# prompt cache; only the per-athlete block after it changes between requests
+SYSTEM_PROMPT_BLOCK = {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+
+ATHLETE_CONTEXT_TEMPLATE = """CURRENT ATHLETE PROFILE (use this — do not ask for info you already have):
+  Name: {name}
+  Sport/Position: {sport}
+  School: {school}
+  Class year: {class_year}
+  State: {state}
+  GPA: {gpa}{stats_str}{combine_str}{goals_str}
+"""
+
+FORK_SCENARIO_TEMPLATE = "HYPOTHETICAL SCENARIO (the athlete is exploring this what-if — adjust all advice accordingly): {scenario}"
+
 # Native web_search tool — Anthropic executes it server-side, no client handling needed
 # query_database — we execute this ourselves (read-only GMTM MySQL)
-TOOLS = [
+# A tuple: the schema is shared by every request and must never be mutated in place
+TOOLS = (
     {
         "type": "web_search_20250305",
         "name": "web_search",
@@ -87,7 +125,21 @@ TOOLS = [
             "required": ["sql"],
         },
     },
-]
+)
+
+# Request fields shared by the streaming and non-streaming loops; the same
+# objects every call keep the tools + system prefix byte-identical for caching
+AGENT_MODEL = "claude-sonnet-4-6"
+AGENT_REQUEST_BASE = {"model": AGENT_MODEL, "tools": TOOLS}
+CHAT_SYSTEM_BLOCKS = [SYSTEM_PROMPT_BLOCK]
+
+# Tool activity and done SSE frames never change — encode them to bytes once at import
+TOOL_ACTIVITY_EVENTS = {
+    "web_search": b"data: " + orjson.dumps({"type": "tool", "label": "🔍 Searching the web..."}) + b"\n\n",
+    "query_database": b"data: " + orjson.dumps({"type": "tool", "label": "🗄️ Querying athlete database..."}) + b"\n\n",
+}
+SSE_DONE_FRAME = b"data: " + orjson.dumps({"type": "done"}) + b"\n\n"
+SSE_DATA_PREFIX_LEN = len(b"data: ")
 
 FORBIDDEN_SQL = ["INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "TRUNCATE", "REPLACE", "GRANT", "REVOKE"]
 
@@ -95,70 +147,229 @@ FORBIDDEN_SQL = ["INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "TRUNC
 # via web_search (live) — not from the GMTM DB (potentially stale).
 ALLOWED_GMTM_TABLES = {"users", "user_metrics", "scholarship_offers", "athlete_profiles", "athlete_metrics"}
 
+# One case-insensitive scan for any write keyword as a statement word (after
+# start, whitespace, ';' or '('), rather than uppercasing the SQL and probing
+# each keyword separately. A following '(' is allowed so REPLACE() still works.
+FORBIDDEN_SQL_PATTERN = re.compile(
+    r"(?:^|[\s;(])(" + "|".join(FORBIDDEN_SQL) + r")(?=[\s;]|$)", re.IGNORECASE
+)
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+
+# String literals and comments, matched together so a quote inside a comment
+# (or "--" inside a string) is read the right way round. Checks run on the SQL
+# with comments removed and literals emptied, so "/**/DELETE" can't slip past
+# and "WHERE note = 'update'" isn't mistaken for a write.
+SQL_LITERAL_OR_COMMENT_PATTERN = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|/\*.*?\*/|--[^\n]*|#[^\n]*",
+    re.DOTALL,
+)
+
+# Chat requests are keyed on (athlete, normalized question, recent history)
+CHAT_KEY_HISTORY = 4
+
+# Identical chat requests (same request key) that arrive while the first is
+# still running await its task instead of making their own Claude calls.
+INFLIGHT_CHATS: dict = {}
+
+# Athlete context rarely changes mid-session; profile edits call
+# invalidate_athlete() so the next turn picks up the new values.
+PROFILE_CACHE = TTLCache(maxsize=10000, ttl=300)
+PROFILE_CACHE_LOCK = threading.Lock()
+
+# Conversation history is trimmed to a token budget rather than a fixed
+# message count — a few long answers can outweigh twenty short turns
+HISTORY_TOKEN_BUDGET = 6000
+HISTORY_MAX_MESSAGES = 40
+HISTORY_CHARS_PER_TOKEN = 4
+ALLOWED_HISTORY_ROLES = frozenset({"user", "assistant"})
+
+# Last HISTORY_MAX_MESSAGES rows (oldest first) per (athlete_id, conversation_id),
+# where conversation_id None is the athlete-wide history. _save_messages appends
+# to warm entries, so a running conversation doesn't re-select its history
+# every turn; the TTL bounds staleness from writes made by other processes.
+HISTORY_CACHE = TTLCache(maxsize=1024, ttl=300)
+HISTORY_CACHE_LOCK = threading.Lock()
+
+# TTLCache is not thread-safe and both caches are touched from worker threads,
+# so every access holds the cache's lock. While a miss is being fetched its
+# slot holds a private token; a write or invalidation in the meantime replaces
+# or drops that token, and the fetched (now stale) value is then not stored.
+
+# A query_database payload at least this large (~1024 tokens, the prompt-cache
+# minimum) gets a cache breakpoint so the follow-up iteration reads the prior
+# assistant turn and tool results from cache instead of re-processing them.
+# With the system prompt and the end of the stored history that is three of
+# the four breakpoints a request may carry.
+TOOL_RESULT_CACHE_MIN_CHARS = 4096
+
+# Text deltas are coalesced into one SSE frame per ~30ms / 256 chars rather
+# than one frame per token; still well under what a reader can perceive
+SSE_TEXT_FLUSH_CHARS = 256
+SSE_TEXT_FLUSH_SECONDS = 0.03
+
+# max_tokens is routed on what the athlete asked for: short drafts don't need
+# the default headroom, multi-part plans and comparisons need more of it
+MAX_TOKENS_SHORT = 1024
+MAX_TOKENS_DEFAULT = 2048
+MAX_TOKENS_LONG = 4096
+SHORT_ANSWER_PATTERN = re.compile(
+    r"\b(e-?mail|dm|direct message|tweet|subject line|intro message|yes or no)\b", re.IGNORECASE
+)
+LONG_ANSWER_PATTERN = re.compile(
+    r"\b(plan|compare|comparison|breakdown|timeline|strategy|step[- ]by[- ]step|pros and cons)\b", re.IGNORECASE
+)
+
+
+# Connections are reused across turns instead of paying a TCP + auth handshake
+# per profile load, history read and message save. Pools open lazily, so
+# importing this module never touches the database; close() hands the
+# connection back (rolling back anything uncommitted).
+AGENT_DB_POOL = PooledDB(
+    creator=pymysql,
+    maxcached=8,
+    maxconnections=20,
+    blocking=True,
+    ping=1,
+    host=os.environ.get("AGENT_DB_HOST", "localhost"),
+    user=os.environ.get("AGENT_DB_USER", "root"),
+    password=os.environ.get("AGENT_DB_PASSWORD", ""),
+    database=os.environ.get("AGENT_DB_NAME", "railway"),
+    port=int(os.environ.get("AGENT_DB_PORT", 3306)),
+    cursorclass=pymysql.cursors.DictCursor,
+)
+
+GMTM_DB_POOL = PooledDB(
+    creator=pymysql,
+    maxcached=8,
+    maxconnections=20,
+    blocking=True,
+    ping=1,
+    host=os.environ.get("DB_HOST"),
+    user=os.environ.get("DB_USER"),
+    password=os.environ.get("DB_PASSWORD"),
+    database="gmtm",
+    port=3306,
+    cursorclass=pymysql.cursors.DictCursor,
+)
+
 
 def _get_agent_db():
-    return pymysql.connect(
-        host=os.environ.get("AGENT_DB_HOST", "localhost"),
-        user=os.environ.get("AGENT_DB_USER", "root"),
-        password=os.environ.get("AGENT_DB_PASSWORD", ""),
-        database=os.environ.get("AGENT_DB_NAME", "railway"),
-        port=int(os.environ.get("AGENT_DB_PORT", 3306)),
-        cursorclass=pymysql.cursors.DictCursor,
-    )
+    return AGENT_DB_POOL.connection()
 
 
 def _get_gmtm_db():
-    return pymysql.connect(
-        host=os.environ["DB_HOST"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-        database="gmtm",
-        port=3306,
-        cursorclass=pymysql.cursors.DictCursor,
-    )
+    return GMTM_DB_POOL.connection()
 
 
-def _run_read_only_query(sql: str) -> dict:
-    """Execute a read-only SELECT query against the GMTM DB (athlete tables only)."""
-    sql_upper = sql.strip().upper()
-    for keyword in FORBIDDEN_SQL:
-        if sql_upper.startswith(keyword) or f" {keyword} " in sql_upper:
-            return {"error": f"GMTM database is READ-ONLY. {keyword} operations are not permitted."}
-    if not sql_upper.startswith("SELECT"):
-        return {"error": "Only SELECT queries are allowed."}
+def _strip_sql_literals(match: re.Match) -> str:
+    return "''" if match.group(0)[0] in "'\"" else " "
+
+
+@lru_cache(maxsize=4096)
+def _read_only_violation(sql: str) -> Optional[str]:
+    """Why this SQL may not run against GMTM, or None. Agents repeat queries, so it's memoized."""
+    code = SQL_LITERAL_OR_COMMENT_PATTERN.sub(_strip_sql_literals, sql).replace("`", "").strip()
+    forbidden = FORBIDDEN_SQL_PATTERN.search(code)
+    if forbidden:
+        return f"GMTM database is READ-ONLY. {forbidden.group(1).upper()} operations are not permitted."
+    if code[:6].upper() != "SELECT":
+        return "Only SELECT queries are allowed."
     # Table allowlist — only athlete-related tables permitted
     # College/program data should come from web_search (live), not GMTM (may be stale)
-    import re
-    referenced_tables = set(re.findall(r'\bFROM\s+(\w+)|\bJOIN\s+(\w+)', sql_upper))
-    flat_tables = {t for pair in referenced_tables for t in pair if t}
+    flat_tables = {t.upper() for t in TABLE_REFERENCE_PATTERN.findall(code)}
     disallowed = flat_tables - {t.upper() for t in ALLOWED_GMTM_TABLES}
     if disallowed:
-        return {
-            "error": (
-                f"Table(s) not permitted: {', '.join(disallowed).lower()}. "
-                "query_database is for athlete stats only. "
-                "Use web_search for college/program information."
-            )
-        }
+        return (
+            f"Table(s) not permitted: {', '.join(disallowed).lower()}. "
+            "query_database is for athlete stats only. "
+            "Use web_search for college/program information."
+        )
+    return None
+
+
+def _run_read_only_query(sql: str) -> dict:
+    """Execute a read-only SELECT query against the GMTM DB (athlete tables only)."""
+    sql = sql.strip()
+    violation = _read_only_violation(sql)
+    if violation:
+        return {"error": violation}
     try:
         db = _get_gmtm_db()
-        with db.cursor() as c:
-            c.execute(sql)
-            rows = c.fetchmany(50)
-        db.close()
+        try:
+            with db.cursor() as c:
+                c.execute(sql)
+                rows = c.fetchmany(50)
+        finally:
+            db.close()
         return {"rows": rows, "count": len(rows)}
     except Exception as e:
         return {"error": str(e)}
 
 
-def _load_athlete_profile(athlete_id: str) -> Optional[dict]:
-    """Load profile from sparq_profiles (new users) or GMTM users (legacy)."""
+def _dump_tool_result(result: dict) -> str:
+    """Serialize a tool result for the tool_result frame (rows can be large)."""
+    return orjson.dumps(result, default=str).decode()
+
+
+def _normalize_question(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings share a key."""
+    return " ".join(re.sub(r"[^a-z0-9\s]", " ", message.lower()).split())
+
+
+def _chat_request_key(athlete_id: str, message: str, history: list) -> tuple:
+    recent = orjson.dumps(history[-CHAT_KEY_HISTORY:], default=str, option=orjson.OPT_SORT_KEYS)
+    return (athlete_id, _normalize_question(message), hashlib.sha1(recent).hexdigest())
+
+
+def invalidate_athlete(athlete_id: str) -> None:
+    """Drop a cached profile after it has been edited."""
+    with PROFILE_CACHE_LOCK:
+        PROFILE_CACHE.pop(athlete_id, None)
+
+
+async def _load_athlete_profile(athlete_id: str) -> Optional[dict]:
+    """Cached wrapper around _fetch_athlete_profile; misses are not cached."""
+    with PROFILE_CACHE_LOCK:
+        profile = PROFILE_CACHE.get(athlete_id)
+        if isinstance(profile, dict):
+            return profile
+        token = PROFILE_CACHE[athlete_id] = object()
+    profile = await _fetch_athlete_profile(athlete_id)
+    with PROFILE_CACHE_LOCK:
+        if PROFILE_CACHE.get(athlete_id) is token:
+            if profile is not None:
+                PROFILE_CACHE[athlete_id] = profile
+            else:
+                del PROFILE_CACHE[athlete_id]
+    return profile
+
+
+async def _fetch_athlete_profile(athlete_id: str) -> Optional[dict]:
+    """Load profile from sparq_profiles (new users) or GMTM users (legacy).
+
+    Both lookups run at once; a sparq profile still wins when both exist.
+    """
+    gmtm_task = None
+    if athlete_id and athlete_id.isdigit():
+        gmtm_task = asyncio.create_task(asyncio.to_thread(_fetch_gmtm_user, athlete_id))
+    profile = await asyncio.to_thread(_fetch_sparq_profile, athlete_id)
+    if profile is not None:
+        if gmtm_task is not None:
+            gmtm_task.cancel()
+        return profile
+    return await gmtm_task if gmtm_task is not None else None
+
+
+def _fetch_sparq_profile(athlete_id: str) -> Optional[dict]:
+    """Profile built from sparq_profiles and its MaxPreps data, or None."""
     try:
         db = _get_agent_db()
-        with db.cursor() as c:
-            c.execute("SELECT * FROM sparq_profiles WHERE clerk_id = %s", (athlete_id,))
-            profile = c.fetchone()
-        db.close()
+        try:
+            with db.cursor() as c:
+                c.execute("SELECT * FROM sparq_profiles WHERE clerk_id = %s", (athlete_id,))
+                profile = c.fetchone()
+        finally:
+            db.close()
         if profile:
             # Parse maxpreps_data JSON for real stats
             maxpreps_raw = profile.get("maxpreps_data")
@@ -191,77 +402,232 @@ def _load_athlete_profile(athlete_id: str) -> Optional[dict]:
             }
     except Exception:
         pass
-    if athlete_id and athlete_id.isdigit():
+    return None
+
+
+def _fetch_gmtm_user(athlete_id: str) -> Optional[dict]:
+    """Legacy GMTM users row for a numeric id, or None."""
+    try:
+        db = _get_gmtm_db()
         try:
-            db = _get_gmtm_db()
             with db.cursor() as c:
                 c.execute(
                     "SELECT first_name, last_name, position, graduation_year, city, state FROM users WHERE id = %s",
                     (int(athlete_id),),
                 )
                 user = c.fetchone()
+        finally:
             db.close()
-            if user:
-                return {"source": "gmtm", **user}
+        if user:
+            return {"source": "gmtm", **user}
+    except Exception:
+        pass
+    return None
+
+
+def _query_database_blocks(content) -> list:
+    """tool_use blocks in an assistant turn that we have to execute ourselves."""
+    return [
+        block for block in content
+        if getattr(block, "type", "") == "tool_use" and block.name == "query_database"
+    ]
+
+
+def _sse_frame(payload: dict) -> bytes:
+    """One stream_agent SSE frame, encoded straight to bytes; text frames go out many times a turn."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _tool_progress_event(result: dict) -> bytes:
+    """SSE tool frame reporting a finished query_database call."""
+    if result.get("error"):
+        label = "🗄️ Database lookup failed — working around it..."
+    else:
+        label = f"🗄️ Found {result.get('count', 0)} athlete records"
+    return _sse_frame({"type": "tool", "label": label})
+
+
+def _tool_results_turn(messages: list, tool_results: list) -> dict:
+    """Build the user turn carrying tool results; only the newest one keeps a cache breakpoint."""
+    for msg in messages:
+        if msg["role"] == "user" and isinstance(msg["content"], list):
+            for block in msg["content"]:
+                if isinstance(block, dict) and block.get("type") == "tool_result":
+                    block.pop("cache_control", None)
+    if sum(len(block["content"]) for block in tool_results) >= TOOL_RESULT_CACHE_MIN_CHARS:
+        tool_results[-1]["cache_control"] = {"type": "ephemeral"}
+    return {"role": "user", "content": tool_results}
+
+
+def _history_with_breakpoint(history: list) -> list:
+    """
+    Copy of history whose last message carries a cache breakpoint, so each
+    follow-up turn reads the earlier conversation from the prompt cache and
+    only prefills the new message. The cached history itself is left untouched.
+    """
+    if not history:
+        return history
+    last = history[-1]
+    content = last["content"]
+    if isinstance(content, str) and content:
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content and isinstance(content[-1], dict):
+        blocks = content[:-1] + [dict(content[-1])]
+    else:
+        return history
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return history[:-1] + [{"role": last["role"], "content": blocks}]
+
+
+def _route_max_tokens(message: str) -> int:
+    """Pick a max_tokens budget for the turn from the athlete's message."""
+    if LONG_ANSWER_PATTERN.search(message):
+        return MAX_TOKENS_LONG
+    if SHORT_ANSWER_PATTERN.search(message):
+        return MAX_TOKENS_SHORT
+    return MAX_TOKENS_DEFAULT
+
+
+def _decode_content(content):
+    """Stored content is either plain text or a JSON-encoded content block list."""
+    if isinstance(content, str):
+        try:
+            return orjson.loads(content)
         except Exception:
             pass
-    return None
+    return content
 
 
-def _load_conversation(athlete_id: str) -> list:
-    """Load last 20 messages for session continuity."""
-    try:
-        db = _get_agent_db()
-        with db.cursor() as c:
-            c.execute(
-                """SELECT role, content FROM agent_messages am
-                   JOIN agent_conversations ac ON am.conversation_id = ac.id
-                   WHERE ac.clerk_id = %s
-                   ORDER BY am.id DESC LIMIT 20""",
-                (athlete_id,),
-            )
-            rows = c.fetchall()
-        db.close()
-        messages = []
-        for row in reversed(rows):
-            content = row["content"]
-            if isinstance(content, str):
-                try:
-                    content = json.loads(content)
-                except Exception:
-                    pass
-            messages.append({"role": row["role"], "content": content})
-        return messages
-    except Exception:
-        return []
+def _estimate_tokens(content) -> int:
+    """Cheap token estimate (~4 chars/token) — close enough for budgeting history."""
+    text = content if isinstance(content, str) else orjson.dumps(content, default=str)
+    return len(text) // HISTORY_CHARS_PER_TOKEN + 1
 
 
-def _save_message(athlete_id: str, role: str, content, conversation_id: Optional[int] = None):
-    """Persist message for conversation history. Uses conversation_id if provided (for forks)."""
+def _fetch_history_rows(athlete_id: str, conversation_id: Optional[int]) -> list:
+    """Newest HISTORY_MAX_MESSAGES messages of the conversation, oldest first."""
+    db = _get_agent_db()
     try:
-        db = _get_agent_db()
         with db.cursor() as c:
             if conversation_id:
-                conv_id = conversation_id
-            else:
                 c.execute(
-                    "INSERT IGNORE INTO agent_conversations (clerk_id, created_at, updated_at) VALUES (%s, NOW(), NOW())",
-                    (athlete_id,),
+                    """SELECT role, content FROM agent_messages am
+                       JOIN agent_conversations ac ON am.conversation_id = ac.id
+                       WHERE am.conversation_id = %s AND ac.clerk_id = %s
+                       ORDER BY am.id DESC LIMIT %s""",
+                    (conversation_id, athlete_id, HISTORY_MAX_MESSAGES),
                 )
-                db.commit()
-                c.execute("SELECT id FROM agent_conversations WHERE clerk_id = %s ORDER BY id ASC LIMIT 1", (athlete_id,))
-                conv = c.fetchone()
-                conv_id = conv["id"] if conv else None
-            if conv_id:
-                content_str = json.dumps(content) if not isinstance(content, str) else content
+            else:
                 c.execute(
-                    "INSERT INTO agent_messages (conversation_id, role, content, created_at) VALUES (%s, %s, %s, NOW())",
-                    (conv_id, role, content_str),
+                    """SELECT role, content FROM agent_messages am
+                       JOIN agent_conversations ac ON am.conversation_id = ac.id
+                       WHERE ac.clerk_id = %s
+                       ORDER BY am.id DESC LIMIT %s""",
+                    (athlete_id, HISTORY_MAX_MESSAGES),
                 )
-        db.commit()
+            rows = c.fetchall()
+    finally:
         db.close()
+    return [{"role": row["role"], "content": _decode_content(row["content"])} for row in reversed(rows)]
+
+
+def _append_history(athlete_id: str, conversation_id: int, role: str, content) -> None:
+    """Add a saved message to the cached histories it belongs to, if they are warm."""
+    with HISTORY_CACHE_LOCK:
+        for key in ((athlete_id, conversation_id), (athlete_id, None)):
+            rows = HISTORY_CACHE.get(key)
+            if isinstance(rows, list):
+                HISTORY_CACHE[key] = (rows + [{"role": role, "content": content}])[-HISTORY_MAX_MESSAGES:]
+            elif rows is not None:
+                # A load is in flight and may have read before this message
+                del HISTORY_CACHE[key]
+
+
+def _load_conversation(athlete_id: str, conversation_id: Optional[int] = None) -> list:
+    """Load the most recent messages that fit in HISTORY_TOKEN_BUDGET for session continuity."""
+    key = (athlete_id, conversation_id or None)
+    with HISTORY_CACHE_LOCK:
+        rows = HISTORY_CACHE.get(key)
+        if not isinstance(rows, list):
+            token = HISTORY_CACHE[key] = object()
+    if not isinstance(rows, list):
+        try:
+            rows = _fetch_history_rows(athlete_id, conversation_id)
+        except Exception:
+            rows = None
+        with HISTORY_CACHE_LOCK:
+            if HISTORY_CACHE.get(key) is token:
+                if rows is None:
+                    del HISTORY_CACHE[key]
+                else:
+                    HISTORY_CACHE[key] = rows
+        if rows is None:
+            return []
+    # Walk newest → oldest, keeping turns until the budget runs out
+    messages = []
+    budget = HISTORY_TOKEN_BUDGET
+    for msg in reversed(rows):
+        if msg["role"] not in ALLOWED_HISTORY_ROLES:
+            continue
+        cost = _estimate_tokens(msg["content"])
+        if cost > budget:
+            break
+        budget -= cost
+        messages.append(msg)
+    messages.reverse()
+    # The messages API requires the history to open with a user turn
+    while messages and messages[0]["role"] != "user":
+        messages.pop(0)
+    return messages
+
+
+def _save_messages(athlete_id: str, turns: list, conversation_id: Optional[int] = None):
+    """
+    Persist (role, content) turns for conversation history in one transaction;
+    the rows go in as a single multi-row INSERT. Uses conversation_id if
+    provided (for forks).
+    """
+    try:
+        db = _get_agent_db()
+        try:
+            with db.cursor() as c:
+                if conversation_id:
+                    # Only append to a conversation this athlete owns
+                    c.execute(
+                        "SELECT id FROM agent_conversations WHERE id = %s AND clerk_id = %s",
+                        (conversation_id, athlete_id),
+                    )
+                    conv = c.fetchone()
+                    conv_id = conv["id"] if conv else None
+                else:
+                    c.execute(
+                        "INSERT IGNORE INTO agent_conversations (clerk_id, created_at, updated_at) VALUES (%s, NOW(), NOW())",
+                        (athlete_id,),
+                    )
+                    c.execute("SELECT id FROM agent_conversations WHERE clerk_id = %s ORDER BY id ASC LIMIT 1", (athlete_id,))
+                    conv = c.fetchone()
+                    conv_id = conv["id"] if conv else None
+                if conv_id:
+                    c.executemany(
+                        "INSERT INTO agent_messages (conversation_id, role, content, created_at) VALUES (%s, %s, %s, NOW())",
+                        [
+                            (conv_id, role, orjson.dumps(content).decode() if not isinstance(content, str) else content)
+                            for role, content in turns
+                        ],
+                    )
+            db.commit()
+        finally:
+            db.close()
+        if conv_id:
+            for role, content in turns:
+                _append_history(athlete_id, conv_id, role, content)
     except Exception as e:
-        print(f"Warning: could not save message: {e}")
+        logger.warning("Could not save message: %s", e)
+
+
+def _save_message(athlete_id: str, role: str, content, conversation_id: Optional[int] = None):
+    """Persist a single message for conversation history."""
+    _save_messages(athlete_id, [(role, content)], conversation_id)
 
 
 @router.get("/api/agent/stream")
@@ -271,11 +637,15 @@ async def stream_agent(athlete_id: str, message: str, session_id: Optional[str]
     - web_search: Anthropic native tool (web_search_20250305) — server-side, no client handling
     - query_database: custom tool — client executes read-only SQL against GMTM DB
     """
+    # Both reads start now and run while the response is set up; generate()
+    # picks up the finished results
+    profile_task = asyncio.create_task(_load_athlete_profile(athlete_id))
+    history_task = asyncio.create_task(asyncio.to_thread(_load_conversation, athlete_id, conversation_id))
 
     async def generate():
-        client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        client = _get_claude()
 
-        profile = _load_athlete_profile(athlete_id)
+        profile = await profile_task
 
         # Build athlete-aware system prompt — always injected, every message
         if profile:
@@ -303,104 +673,142 @@ async def stream_agent(athlete_id: str, message: str, session_id: Optional[str]
                 except Exception:
                     pass
 
-            athlete_context = f"""
-
-CURRENT ATHLETE PROFILE (use this — do not ask for info you already have):
-  Name: {profile.get("name") or "Unknown"}
-  Sport/Position: {profile.get("sport") or profile.get("position") or "Unknown"}
-  School: {profile.get("school") or "Unknown"}
-  Class year: {profile.get("class_year") or "Unknown"}
-  State: {profile.get("state") or "Unknown"}
-  GPA: {profile.get("gpa") or "not provided"}{stats_str}{combine_str}{goals_str}
-"""
+            athlete_context = ATHLETE_CONTEXT_TEMPLATE.format(
+                name=profile.get("name") or "Unknown",
+                sport=profile.get("sport") or profile.get("position") or "Unknown",
+                school=profile.get("school") or "Unknown",
+                class_year=profile.get("class_year") or "Unknown",
+                state=profile.get("state") or "Unknown",
+                gpa=profile.get("gpa") or "not provided",
+                stats_str=stats_str,
+                combine_str=combine_str,
+                goals_str=goals_str,
+            )
         else:
             athlete_context = ""
 
-        system_with_profile = SYSTEM_PROMPT + athlete_context
         if fork_scenario:
-            system_with_profile += f"\n\nHYPOTHETICAL SCENARIO (the athlete is exploring this what-if — adjust all advice accordingly): {fork_scenario}"
+            athlete_context += "\n\n" + FORK_SCENARIO_TEMPLATE.format(scenario=fork_scenario)
+
+        system_with_profile = [SYSTEM_PROMPT_BLOCK]
+        if athlete_context:
+            system_with_profile.append({"type": "text", "text": athlete_context.strip()})
 
-        history = _load_conversation(athlete_id, conversation_id=conversation_id)
-        messages = history + [{"role": "user", "content": message}]
-        _save_message(athlete_id, "user", message, conversation_id=conversation_id)
+        history = await history_task
+        messages = _history_with_breakpoint(history) + [{"role": "user", "content": message}]
+        # The user row is written while Claude starts on the reply; the
+        # assistant row waits for it so the two stay in order
+        save_user = asyncio.create_task(asyncio.to_thread(_save_message, athlete_id, "user", message, conversation_id))
 
         # Agentic loop — continues until end_turn
         # web_search is native: Anthropic executes it server-side within the stream,
         # result blocks come back automatically, stop_reason stays "end_turn"
         # query_database is custom: we execute it and loop back with tool_results
         pending_tool_results = []
+        max_tokens = _route_max_tokens(message)
 
         while True:
             if pending_tool_results:
-                messages.append({"role": "user", "content": pending_tool_results})
+                messages.append(_tool_results_turn(messages, pending_tool_results))
                 pending_tool_results = []
 
-            with client.messages.stream(
-                model="claude-sonnet-4-6",
-                max_tokens=2048,
+            async with CLAUDE_CONCURRENCY, client.messages.stream(
+                **AGENT_REQUEST_BASE,
+                max_tokens=max_tokens,
                 system=system_with_profile,
-                tools=TOOLS,
                 messages=messages,
             ) as stream:
 
-                current_text = ""
+                text_parts = []
                 assistant_content = []
+                pending_text = []
+                pending_chars = 0
+                last_flush = time.monotonic()
 
-                for event in stream:
+                async for event in stream:
                     if not hasattr(event, "type"):
                         continue
 
                     if event.type == "content_block_start":
                         block = event.content_block
                         block_type = getattr(block, "type", "")
-                        if block_type == "tool_use":
-                            tool_name = getattr(block, "name", "")
-                            if tool_name == "web_search":
-                                yield f"data: {json.dumps({'type': 'tool', 'label': '🔍 Searching the web...'})}\n\n"
-                            elif tool_name == "query_database":
-                                yield f"data: {json.dumps({'type': 'tool', 'label': '🗄️ Querying athlete database...'})}\n\n"
+                        if block_type != "text":
+                            # Text before a tool call (client tool_use or the
+                            # server-side web_search) goes out before it runs
+                            if pending_text:
+                                yield _sse_frame({"type": "text", "text": "".join(pending_text)})
+                                pending_text, pending_chars = [], 0
+                                last_flush = time.monotonic()
+                            if block_type in ("tool_use", "server_tool_use"):
+                                tool_event = TOOL_ACTIVITY_EVENTS.get(getattr(block, "name", ""))
+                                if tool_event:
+                                    yield tool_event
 
                     elif event.type == "content_block_delta":
                         delta = event.delta
                         delta_type = getattr(delta, "type", "")
                         if delta_type == "text_delta" and delta.text:
-                            current_text += delta.text
-                            yield f"data: {json.dumps({'type': 'text', 'text': delta.text})}\n\n"
-
-                final_message = stream.get_final_message()
-                assistant_content = final_message.content
-                messages.append({"role": "assistant", "content": assistant_content})
-
-                if final_message.stop_reason == "end_turn":
-                    # Done — web_search (if used) was handled server-side within the stream
-                    _save_message(athlete_id, "assistant", current_text, conversation_id=conversation_id)
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
-                    return
+                            text_parts.append(delta.text)
+                            pending_text.append(delta.text)
+                            pending_chars += len(delta.text)
+                            now = time.monotonic()
+                            if pending_chars >= SSE_TEXT_FLUSH_CHARS or now - last_flush >= SSE_TEXT_FLUSH_SECONDS:
+                                yield _sse_frame({"type": "text", "text": "".join(pending_text)})
+                                pending_text, pending_chars = [], 0
+                                last_flush = now
+
+                final_message = await stream.get_final_message()
+
+            # The semaphore only covers the open Anthropic stream — flushing,
+            # tool queries and saves below run without holding a slot
+            if pending_text:
+                yield _sse_frame({"type": "text", "text": "".join(pending_text)})
+
+            assistant_content = final_message.content
+            messages.append({"role": "assistant", "content": assistant_content})
+
+            if final_message.stop_reason == "end_turn":
+                # Done — web_search (if used) was handled server-side within the stream
+                await save_user
+                save_reply = asyncio.create_task(asyncio.to_thread(_save_message, athlete_id, "assistant", "".join(text_parts), conversation_id))
+                yield SSE_DONE_FRAME
+                await save_reply
+                return
+
+            elif final_message.stop_reason == "tool_use":
+                # Only query_database requires client-side handling
+                # web_search_20250305 is server-side, no tool_result needed from us
+                query_blocks = _query_database_blocks(assistant_content)
+                tasks = [
+                    asyncio.create_task(asyncio.to_thread(_run_read_only_query, block.input.get("sql", "")))
+                    for block in query_blocks
+                ]
+                # Queries run concurrently; surface each result the moment it lands
+                for finished in asyncio.as_completed(tasks):
+                    yield _tool_progress_event(await finished)
+                for block, task in zip(query_blocks, tasks):
+                    pending_tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": _dump_tool_result(task.result()),
+                    })
 
-                elif final_message.stop_reason == "tool_use":
-                    # Only query_database requires client-side handling
-                    # web_search_20250305 is server-side — skip it here
-                    for block in assistant_content:
-                        if not (hasattr(block, "type") and block.type == "tool_use"):
-                            continue
-                        if block.name == "query_database":
-                            result = _run_read_only_query(block.input.get("sql", ""))
-                            pending_tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": block.id,
-                                "content": json.dumps(result, default=str),
-                            })
-                        # web_search_20250305: server-side, no tool_result needed from us
-
-                    if not pending_tool_results:
-                        # No custom tools to handle — done
-                        _save_message(athlete_id, "assistant", current_text, conversation_id=conversation_id)
-                        yield f"data: {json.dumps({'type': 'done'})}\n\n"
-                        return
-                    # Loop continues to send query_database results
-                else:
-                    yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                if not pending_tool_results:
+                    # No custom tools to handle — done
+                    await save_user
+                    save_reply = asyncio.create_task(asyncio.to_thread(_save_message, athlete_id, "assistant", "".join(text_parts), conversation_id))
+                    yield SSE_DONE_FRAME
+                    await save_reply
                     return
+                # Loop continues to send query_database results
+            else:
+                # max_tokens (likely on the short email/DM budget) — keep the
+                # truncated reply so history doesn't end on an unanswered user row
+                await save_user
+                save_reply = asyncio.create_task(asyncio.to_thread(_save_message, athlete_id, "assistant", "".join(text_parts), conversation_id))
+                yield SSE_DONE_FRAME
+                await save_reply
+                return
 
     return StreamingResponse(
         generate(),
@@ -409,34 +817,23 @@ CURRENT ATHLETE PROFILE (use this — do not ask for info you already have):
     )
 
 
-@router.post("/api/agent/chat")
-async def chat_agent(request: dict):
-    """Non-streaming legacy endpoint."""
-    athlete_id = str(request.get("athlete_id", ""))
-    message = request.get("message", "")
-
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    profile = _load_athlete_profile(athlete_id)
-    profile_context = f"\n\nAthlete profile:\n{json.dumps(profile, default=str)}\n" if profile else ""
-    history = _load_conversation(athlete_id)
-    user_content = f"{profile_context}\n\nUser question: {message}" if (profile_context and not history) else message
-    messages = history + [{"role": "user", "content": user_content}]
-
+async def _run_chat_loop(client: anthropic.AsyncAnthropic, messages: list, max_tokens: int) -> str:
+    """Non-streaming tool loop; returns the reply text."""
     full_text = ""
     pending_tool_results = []
 
     while True:
         if pending_tool_results:
-            messages.append({"role": "user", "content": pending_tool_results})
+            messages.append(_tool_results_turn(messages, pending_tool_results))
             pending_tool_results = []
 
-        response = client.messages.create(
-            model="claude-sonnet-4-6",
-            max_tokens=2048,
-            system=SYSTEM_PROMPT,
-            tools=TOOLS,
-            messages=messages,
-        )
+        async with CLAUDE_CONCURRENCY:
+            response = await client.messages.create(
+                **AGENT_REQUEST_BASE,
+                max_tokens=max_tokens,
+                system=CHAT_SYSTEM_BLOCKS,
+                messages=messages,
+            )
         messages.append({"role": "assistant", "content": response.content})
 
         for block in response.content:
@@ -446,62 +843,141 @@ async def chat_agent(request: dict):
         if response.stop_reason == "end_turn":
             break
         elif response.stop_reason == "tool_use":
-            for block in response.content:
-                if hasattr(block, "type") and block.type == "tool_use" and block.name == "query_database":
-                    result = _run_read_only_query(block.input.get("sql", ""))
-                    pending_tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": json.dumps(result, default=str),
-                    })
+            query_blocks = _query_database_blocks(response.content)
+            results = await asyncio.gather(*(
+                asyncio.to_thread(_run_read_only_query, block.input.get("sql", ""))
+                for block in query_blocks
+            ))
+            for block, result in zip(query_blocks, results):
+                pending_tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": _dump_tool_result(result),
+                })
             if not pending_tool_results:
                 break
         else:
             break
 
-    _save_message(athlete_id, "user", user_content)
-    _save_message(athlete_id, "assistant", full_text)
-    return {"response": full_text}
+    return full_text
 
 
-# ── Session Forking ────────────────────────────────────────────────────────────
+@router.post("/api/agent/chat")
+async def chat_agent(request: dict):
+    """Non-streaming legacy endpoint."""
+    athlete_id = str(request.get("athlete_id", ""))
+    message = request.get("message", "")
 
-def _ensure_fork_columns():
-    """Add fork columns to agent_conversations if missing (idempotent)."""
+    profile, history = await asyncio.gather(
+        _load_athlete_profile(athlete_id),
+        asyncio.to_thread(_load_conversation, athlete_id),
+    )
+    profile_context = f"\n\nAthlete profile:\n{json.dumps(profile, default=str)}\n" if profile else ""
+    user_content = f"{profile_context}\n\nUser question: {message}" if (profile_context and not history) else message
+    messages = _history_with_breakpoint(history) + [{"role": "user", "content": user_content}]
+
+    request_key = _chat_request_key(athlete_id, message, history)
+
+    # A double-submitted question rides on the call already in flight
+    inflight = INFLIGHT_CHATS.get(request_key)
+    if inflight is not None:
+        full_text = await asyncio.shield(inflight)
+        await asyncio.to_thread(_save_messages, athlete_id, [("user", user_content), ("assistant", full_text)])
+        return {"response": full_text}
+
+    # Shielded so followers still get an answer if this client disconnects
+    task = asyncio.ensure_future(_run_chat_loop(_get_claude(), messages, _route_max_tokens(message)))
+    INFLIGHT_CHATS[request_key] = task
+    task.add_done_callback(lambda _: INFLIGHT_CHATS.pop(request_key, None))
+    full_text = await asyncio.shield(task)
+
+    await asyncio.to_thread(_save_messages, athlete_id, [("user", user_content), ("assistant", full_text)])
+    return {"response": full_text}
+
+
+def _owns_conversation(athlete_id: str, conversation_id) -> bool:
+    db = _get_agent_db()
     try:
-        db = _get_agent_db()
         with db.cursor() as c:
-            for ddl in [
-                "ALTER TABLE agent_conversations ADD COLUMN fork_scenario VARCHAR(500) DEFAULT NULL",
-                "ALTER TABLE agent_conversations ADD COLUMN parent_id INT DEFAULT NULL",
-            ]:
-                try:
-                    c.execute(ddl)
-                    db.commit()
-                except Exception:
-                    db.rollback()
+            c.execute(
+                "SELECT 1 FROM agent_conversations WHERE id = %s AND clerk_id = %s",
+                (conversation_id, athlete_id),
+            )
+            return c.fetchone() is not None
+    finally:
         db.close()
-    except Exception:
-        pass
 
 
-@router.post("/api/agent/fork")
-async def fork_session(request: dict):
+@router.post("/api/agent/chat/stream")
+async def chat_stream(request: dict):
     """
-    Create a What-If fork of the athlete's current conversation.
-    Copies parent messages into a new conversation with fork_scenario set.
-    Returns: {session_id: str, fork_scenario: str}
+    Streaming counterpart to /api/agent/chat for the athlete page chat.
+    Relays stream_agent's frames as the named SSE events that client reads
+    (status / text / error), so tokens render as they are generated.
     """
-    _ensure_fork_columns()
     athlete_id = str(request.get("athlete_id", ""))
-    scenario = str(request.get("scenario", "")).strip()[:500]
-    parent_conv_id = request.get("parent_conversation_id")  # optional int
+    message = request.get("message", "")
+    conversation_id = request.get("conversation_id")
+    if conversation_id and not await asyncio.to_thread(_owns_conversation, athlete_id, conversation_id):
+        # Someone else's thread — fall back to the athlete's own history
+        conversation_id = None
+    upstream = await stream_agent(athlete_id, message, conversation_id=conversation_id)
+
+    async def relay():
+        try:
+            async for frame in upstream.body_iterator:
+                event = orjson.loads(frame[SSE_DATA_PREFIX_LEN:])
+                if event["type"] == "tool":
+                    yield b"event: status\ndata: " + event["label"].encode() + b"\n\n"
+                elif event["type"] == "text":
+                    # stream_agent's frame is already one JSON data line — forward it as-is
+                    yield b"event: text\n" + frame
+        except Exception as e:
+            logger.exception("Chat stream failed for %s", athlete_id)
+            yield b"event: error\n" + _sse_frame({"type": "error", "message": str(e)})
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    if not athlete_id or not scenario:
-        return {"error": "athlete_id and scenario are required"}, 400
 
+# ── Session Forking ────────────────────────────────────────────────────────────
+
+_fork_columns_ready = False
+
+
+def _ensure_fork_columns():
+    """Add fork columns to agent_conversations if missing (idempotent, once per process)."""
+    global _fork_columns_ready
+    if _fork_columns_ready:
+        return
     try:
         db = _get_agent_db()
+        try:
+            with db.cursor() as c:
+                for ddl in [
+                    "ALTER TABLE agent_conversations ADD COLUMN fork_scenario VARCHAR(500) DEFAULT NULL",
+                    "ALTER TABLE agent_conversations ADD COLUMN parent_id INT DEFAULT NULL",
+                ]:
+                    try:
+                        c.execute(ddl)
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+        finally:
+            db.close()
+        _fork_columns_ready = True
+    except Exception:
+        pass
+
+
+def _create_fork(athlete_id: str, scenario: str, parent_conv_id) -> int:
+    """Insert the fork conversation, copy the parent's messages into it and return its id."""
+    _ensure_fork_columns()
+    db = _get_agent_db()
+    try:
         with db.cursor() as c:
             # Find parent conversation
             if parent_conv_id:
@@ -528,8 +1004,31 @@ async def fork_session(request: dict):
                     (fork_conv_id, parent_id),
                 )
                 db.commit()
-
+    finally:
         db.close()
+    # The athlete-wide history now also covers the copied messages
+    with HISTORY_CACHE_LOCK:
+        HISTORY_CACHE.pop((athlete_id, None), None)
+    return fork_conv_id
+
+
+@router.post("/api/agent/fork")
+async def fork_session(request: dict):
+    """
+    Create a What-If fork of the athlete's current conversation.
+    Copies parent messages into a new conversation with fork_scenario set.
+    Returns: {session_id: str, fork_scenario: str}
+    """
+    athlete_id = str(request.get("athlete_id", ""))
+    scenario = str(request.get("scenario", "")).strip()[:500]
+    parent_conv_id = request.get("parent_conversation_id")  # optional int
+
+    if not athlete_id or not scenario:
+        return {"error": "athlete_id and scenario are required"}, 400
+
+    try:
+        # Pooled pymysql is blocking, so the whole fork runs off the event loop
+        fork_conv_id = await asyncio.to_thread(_create_fork, athlete_id, scenario, parent_conv_id)
         return {"session_id": str(fork_conv_id), "fork_scenario": scenario}
     except Exception as e:
         return {"error": str(e)}
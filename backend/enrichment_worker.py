@@ -5,6 +5,7 @@ Uses raw anthropic SDK + asyncio.gather for true parallelism (no claude CLI requ
 
 import asyncio
 import json
+import logging
 import os
 import re
 from typing import Dict, List, Optional
@@ -14,10 +15,11 @@ import pymysql
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env"))
-load_dotenv()
 
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 
+logger = logging.getLogger(__name__)
+
 
 def _get_agent_db():
     return pymysql.connect(
@@ -65,9 +67,9 @@ def _store_research(college_target_id: int, research: Dict):
                 (json.dumps(reasons), college_target_id),
             )
         db.commit()
-        print(f"[Enrichment] Stored research for college_target {college_target_id}")
+        logger.info("[Enrichment] Stored research for college_target %s", college_target_id)
     except Exception as e:
-        print(f"[Enrichment] Warning: could not store research for college {college_target_id}: {e}")
+        logger.warning("[Enrichment] Could not store research for college %s: %s", college_target_id, e)
     finally:
         db.close()
 
@@ -89,6 +91,12 @@ Required JSON format:
 Return ONLY the JSON object. No markdown, no code fences, no explanation.
 """
 
+# Every college research call (live or batched) shares tools + this system
+# prompt, so the prefix is marked for prompt caching.
+RESEARCHER_SYSTEM_BLOCKS = [
+    {"type": "text", "text": RESEARCHER_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+
 AI_MATCHING_SYSTEM = """You are a college recruiting analyst. Return ONLY a valid JSON array — no markdown, no explanation.
 
 Each program object must have:
@@ -110,11 +118,36 @@ Requirements:
 - Return 8-12 programs total as a JSON array only
 """
 
+MATCHING_USER_PROMPT = (
+    "Generate a college target list for this athlete:\n"
+    "- Sport: {sport}, Position: {position}\n"
+    "- Class of {class_year}, from {state}\n"
+    "- Stats: {stats_str}\n"
+    "- Target division: {target_level}, Geography: {geography}\n\n"
+    "Return 8-12 realistic college {sport} programs that would recruit this athlete. "
+    "Mix 2-3 reach schools with 5-7 realistic fits. "
+    "For each, explain specifically why they fit this athlete's stats and goals. "
+    "Return ONLY a JSON array."
+)
+
+RESEARCH_USER_PROMPT = (
+    "Research {college_name} ({division}, {city}, {state}) {sport} program. "
+    "IMPORTANT: The athlete plays {sport}. If this is 'Girls Basketball' or 'Women's Basketball', research the WOMEN'S program only. "
+    "I'm looking for information relevant to a {position} {sport} recruit from {athlete_state}, Class of 2026. "
+    "Find: head coach, {sport} position coach, coaching philosophy, 2026 recruiting needs for this position, "
+    "recent scholarship offer activity, any upcoming camps or showcases, and why this program fits the athlete. "
+    "Return your findings as JSON only."
+)
+
 WEB_SEARCH_TOOL = {
     "type": "web_search_20260209",
     "name": "web_search",
 }
 
+# Scheduled re-enrichment goes through the Message Batches API (half the token
+# price, results within 24h); onboarding keeps the live parallel path. One cron
+# submits the batch and records its id, another collects it once it has ended.
+
 
 def _extract_json(text: str) -> Optional[Dict]:
     """Extract first valid JSON object from text."""
@@ -153,20 +186,18 @@ def ai_match_programs_sync(athlete_profile: Dict) -> List[Dict]:
     stats = athlete_profile.get("maxpreps_stats") or {}
     stats_str = ", ".join(f"{k}: {v}" for k, v in stats.items()) if stats else "no stats provided"
 
-    user_prompt = (
-        f"Generate a college target list for this athlete:\n"
-        f"- Sport: {sport}, Position: {position}\n"
-        f"- Class of {class_year}, from {state}\n"
-        f"- Stats: {stats_str}\n"
-        f"- Target division: {target_level}, Geography: {geography}\n\n"
-        f"Return 8-12 realistic college {sport} programs that would recruit this athlete. "
-        "Mix 2-3 reach schools with 5-7 realistic fits. "
-        "For each, explain specifically why they fit this athlete's stats and goals. "
-        "Return ONLY a JSON array."
+    user_prompt = MATCHING_USER_PROMPT.format(
+        sport=sport,
+        position=position,
+        class_year=class_year,
+        state=state,
+        stats_str=stats_str,
+        target_level=target_level,
+        geography=geography,
     )
 
     try:
-        print(f"[Matching] Calling Claude for {sport} {position} from {state}...")
+        logger.info("[Matching] Calling Claude for %s %s from %s...", sport, position, state)
         response = client.messages.create(
             model="claude-sonnet-4-6",
             max_tokens=3000,
@@ -174,7 +205,7 @@ def ai_match_programs_sync(athlete_profile: Dict) -> List[Dict]:
             messages=[{"role": "user", "content": user_prompt}],
         )
         full_text = "".join(b.text for b in response.content if hasattr(b, "text"))
-        print(f"[Matching] Response ({len(full_text)} chars): {full_text[:200]}")
+        logger.debug("[Matching] Response (%d chars): %.200s", len(full_text), full_text)
 
         for pattern in [r"\[\s*\{.*?\}\s*\]", r"\[.*?\]"]:
             m = re.search(pattern, full_text, re.DOTALL)
@@ -182,7 +213,7 @@ def ai_match_programs_sync(athlete_profile: Dict) -> List[Dict]:
                 try:
                     programs = json.loads(m.group())
                     if isinstance(programs, list) and programs:
-                        print(f"[Matching] Found {len(programs)} programs")
+                        logger.info("[Matching] Found %d programs", len(programs))
                         return programs
                 except Exception:
                     pass
@@ -193,9 +224,9 @@ def ai_match_programs_sync(athlete_profile: Dict) -> List[Dict]:
                 return parsed
         except Exception:
             pass
-        print(f"[Matching] Could not parse JSON from response")
+        logger.warning("[Matching] Could not parse JSON from response")
     except Exception as e:
-        print(f"[Matching] Claude call failed: {e}")
+        logger.error("[Matching] Claude call failed: %s", e)
     return []
 
 
@@ -207,6 +238,35 @@ async def ai_match_programs(athlete_profile: Dict) -> List[Dict]:
         return await loop.run_in_executor(pool, ai_match_programs_sync, athlete_profile)
 
 
+def _research_params(college: Dict, athlete_position: str, athlete_state: str, athlete_sport: str) -> Dict:
+    """messages.create kwargs for one college's research call (also used as batch params)."""
+    user_prompt = RESEARCH_USER_PROMPT.format(
+        college_name=college["college_name"],
+        division=college.get("division", ""),
+        city=college.get("college_city", ""),
+        state=college.get("college_state", ""),
+        sport=athlete_sport,
+        position=athlete_position,
+        athlete_state=athlete_state,
+    )
+    return {
+        "model": "claude-sonnet-4-6",
+        "max_tokens": 2048,
+        "system": RESEARCHER_SYSTEM_BLOCKS,
+        "tools": [WEB_SEARCH_TOOL],
+        "messages": [{"role": "user", "content": user_prompt}],
+    }
+
+
+def _research_from_content(content) -> Optional[Dict]:
+    for block in content:
+        if hasattr(block, "text"):
+            result = _extract_json(block.text)
+            if result:
+                return result
+    return None
+
+
 async def _research_one_college(
     client: anthropic.AsyncAnthropic,
     college: Dict,
@@ -216,39 +276,21 @@ async def _research_one_college(
 ) -> Optional[Dict]:
     """Research a single college program using Anthropic web_search tool."""
     college_name = college["college_name"]
-    division = college.get("division", "")
-    city = college.get("college_city", "")
-    state = college.get("college_state", "")
-
-    user_prompt = (
-        f"Research {college_name} ({division}, {city}, {state}) {athlete_sport} program. "
-        f"IMPORTANT: The athlete plays {athlete_sport}. If this is 'Girls Basketball' or 'Women's Basketball', research the WOMEN'S program only. "
-        f"I'm looking for information relevant to a {athlete_position} {athlete_sport} recruit from {athlete_state}, Class of 2026. "
-        f"Find: head coach, {athlete_sport} position coach, coaching philosophy, 2026 recruiting needs for this position, "
-        "recent scholarship offer activity, any upcoming camps or showcases, and why this program fits the athlete. "
-        "Return your findings as JSON only."
-    )
 
     try:
         # web_search_20260209 is fully server-side — single API call handles search + response
         response = await client.messages.create(
-            model="claude-sonnet-4-6",
-            max_tokens=2048,
-            system=RESEARCHER_SYSTEM_PROMPT,
-            tools=[WEB_SEARCH_TOOL],
-            messages=[{"role": "user", "content": user_prompt}],
+            **_research_params(college, athlete_position, athlete_state, athlete_sport)
         )
 
-        for block in response.content:
-            if hasattr(block, "text"):
-                result = _extract_json(block.text)
-                if result:
-                    return result
+        result = _research_from_content(response.content)
+        if result:
+            return result
 
-        print(f"[Enrichment] No valid JSON from researcher for {college_name}")
+        logger.warning("[Enrichment] No valid JSON from researcher for %s", college_name)
 
     except Exception as e:
-        print(f"[Enrichment] Error researching {college_name}: {e}")
+        logger.error("[Enrichment] Error researching %s: %s", college_name, e)
 
     return None
 
@@ -260,10 +302,13 @@ async def enrich_college_targets(sparq_profile_id: int, athlete_position: str, a
     """
     colleges = _get_college_targets(sparq_profile_id)
     if not colleges:
-        print(f"[Enrichment] No college targets found for profile {sparq_profile_id}")
+        logger.info("[Enrichment] No college targets found for profile %s", sparq_profile_id)
         return
 
-    print(f"[Enrichment] Researching {len(colleges)} colleges for profile {sparq_profile_id} ({athlete_position} {athlete_sport} from {athlete_state})...")
+    logger.info(
+        "[Enrichment] Researching %d colleges for profile %s (%s %s from %s)...",
+        len(colleges), sparq_profile_id, athlete_position, athlete_sport, athlete_state,
+    )
 
     client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
 
@@ -277,20 +322,177 @@ async def enrich_college_targets(sparq_profile_id: int, athlete_position: str, a
     stored = 0
     for college, result in zip(colleges, results):
         if isinstance(result, Exception):
-            print(f"[Enrichment] Exception for {college['college_name']}: {result}")
+            logger.error("[Enrichment] Exception for %s: %s", college["college_name"], result)
             continue
         if result:
             _store_research(college["id"], result)
             stored += 1
 
-    print(f"[Enrichment] Complete — enriched {stored}/{len(colleges)} colleges for profile {sparq_profile_id}")
+    logger.info("[Enrichment] Complete — enriched %d/%d colleges for profile %s", stored, len(colleges), sparq_profile_id)
+    _mark_enrichment_complete([sparq_profile_id])
+
+
+def _mark_enrichment_complete(sparq_profile_ids: List[int]):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
-            c.execute(
+            c.executemany(
                 "UPDATE sparq_profiles SET enrichment_complete = 1 WHERE id = %s",
-                (sparq_profile_id,),
+                [(pid,) for pid in sparq_profile_ids],
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+_batch_table_ready = False
+
+
+def _ensure_batch_table():
+    """Create enrichment_batches if missing (idempotent, once per process)."""
+    global _batch_table_ready
+    if _batch_table_ready:
+        return
+    db = _get_agent_db()
+    try:
+        with db.cursor() as c:
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS enrichment_batches (
+                    batch_id VARCHAR(255) PRIMARY KEY,
+                    request_count INT NOT NULL,
+                    status VARCHAR(20) DEFAULT 'submitted',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    collected_at TIMESTAMP NULL DEFAULT NULL
+                )
+            """)
+        db.commit()
+    finally:
+        db.close()
+    _batch_table_ready = True
+
+
+def _pending_batch_ids() -> List[str]:
+    _ensure_batch_table()
+    db = _get_agent_db()
+    try:
+        with db.cursor() as c:
+            c.execute("SELECT batch_id FROM enrichment_batches WHERE status = 'submitted' ORDER BY created_at")
+            return [row["batch_id"] for row in c.fetchall()]
+    finally:
+        db.close()
+
+
+def _record_batch(batch_id: str, request_count: int):
+    db = _get_agent_db()
+    try:
+        with db.cursor() as c:
+            c.execute(
+                "INSERT INTO enrichment_batches (batch_id, request_count) VALUES (%s, %s)",
+                (batch_id, request_count),
             )
         db.commit()
     finally:
         db.close()
+
+
+def _mark_batch_collected(batch_id: str):
+    db = _get_agent_db()
+    try:
+        with db.cursor() as c:
+            c.execute(
+                "UPDATE enrichment_batches SET status = 'collected', collected_at = NOW() WHERE batch_id = %s",
+                (batch_id,),
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _get_profiles_for_refresh() -> List[Dict]:
+    db = _get_agent_db()
+    try:
+        with db.cursor() as c:
+            c.execute("SELECT id, position, state, maxpreps_data FROM sparq_profiles")
+            rows = c.fetchall()
+    finally:
+        db.close()
+
+    athletes = []
+    for row in rows:
+        mp = row.get("maxpreps_data") or {}
+        if isinstance(mp, str):
+            try:
+                mp = json.loads(mp)
+            except Exception:
+                mp = {}
+        sports = mp.get("sports") or []
+        athletes.append({
+            "sparq_profile_id": row["id"],
+            "position": row.get("position") or "Athlete",
+            "state": row.get("state") or "US",
+            "sport": sports[0] if sports else mp.get("sport"),
+        })
+    return athletes
+
+
+def submit_college_refresh_batch() -> Optional[str]:
+    """
+    Weekly refresh, step one: submit one Message Batch re-researching every
+    athlete's college targets and record its id. Skips submitting while an
+    earlier batch is still uncollected, so a retried cron never pays twice.
+    Returns the new batch id, or None if nothing was submitted.
+    """
+    pending = _pending_batch_ids()
+    if pending:
+        logger.info("[Enrichment] Batch %s not collected yet — skipping refresh", pending[0])
+        return None
+
+    requests = []
+    for athlete in _get_profiles_for_refresh():
+        for college in _get_college_targets(athlete["sparq_profile_id"]):
+            requests.append({
+                "custom_id": f"ct-{college['id']}",
+                "params": _research_params(
+                    college, athlete["position"], athlete["state"], athlete.get("sport") or "Basketball"
+                ),
+            })
+    if not requests:
+        return None
+
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    batch = client.messages.batches.create(requests=requests)
+    _record_batch(batch.id, len(requests))
+    logger.info("[Enrichment] Submitted batch %s with %d college researches", batch.id, len(requests))
+    return batch.id
+
+
+def collect_college_refresh_batches() -> int:
+    """
+    Weekly refresh, step two (run often): store results for every recorded
+    batch that has ended. Returns the number of college targets updated.
+    """
+    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    stored = 0
+    for batch_id in _pending_batch_ids():
+        batch = client.messages.batches.retrieve(batch_id)
+        if batch.processing_status != "ended":
+            continue
+
+        batch_stored = failed = 0
+        for entry in client.messages.batches.results(batch_id):
+            if entry.result.type != "succeeded":
+                logger.warning("[Enrichment] Batch request %s %s", entry.custom_id, entry.result.type)
+                failed += 1
+                continue
+            result = _research_from_content(entry.result.message.content)
+            if not result:
+                logger.warning("[Enrichment] No valid JSON from batch request %s", entry.custom_id)
+                failed += 1
+                continue
+            _store_research(int(entry.custom_id.removeprefix("ct-")), result)
+            batch_stored += 1
+
+        _mark_batch_collected(batch_id)
+        logger.info("[Enrichment] Batch %s collected — enriched %d colleges, %d failed", batch_id, batch_stored, failed)
+        stored += batch_stored
+    return stored
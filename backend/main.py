@@ -9,7 +9,12 @@ Deployment: Vercel, Railway, or Render
 """
 
 import os
+import sys
 import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
 from datetime import datetime
 from typing import Optional
 from fastapi import FastAPI, HTTPException, BackgroundTasks
@@ -21,6 +26,29 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# ============================================
+# LOGGING
+# ============================================
+
+def _configure_logging():
+    """
+    Route all logging through a QueueHandler so request handlers and worker
+    threads only enqueue records; a background QueueListener does the stdout I/O.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+_configure_logging()
+
 # Import sandbox runner
 from sandbox_runner import run_agent_in_sandbox, AgentResult
 
@@ -303,6 +331,41 @@ async def cron_performance_dashboard():
     )
     return {"status": result.status, "output": result.output[:500] if result.output else None}
 
+@app.get("/cron/college-refresh")
+def cron_college_refresh():
+    """
+    Cron endpoint that submits the college target research batch (weekly).
+    Results are stored later by /cron/college-refresh-collect.
+
+    Configure in vercel.json:
+    {
+      "crons": [{
+        "path": "/cron/college-refresh",
+        "schedule": "0 6 * * 0"
+      }]
+    }
+    """
+    from enrichment_worker import submit_college_refresh_batch
+    batch_id = submit_college_refresh_batch()
+    return {"status": "submitted" if batch_id else "skipped", "batch_id": batch_id}
+
+@app.get("/cron/college-refresh-collect")
+def cron_college_refresh_collect():
+    """
+    Cron endpoint that stores results of ended research batches (every 30 minutes)
+
+    Configure in vercel.json:
+    {
+      "crons": [{
+        "path": "/cron/college-refresh-collect",
+        "schedule": "*/30 * * * *"
+      }]
+    }
+    """
+    from enrichment_worker import collect_college_refresh_batches
+    stored = collect_college_refresh_batches()
+    return {"status": "completed", "colleges_updated": stored}
+
 # ============================================
 # ERROR HANDLERS
 # ============================================
@@ -7,14 +7,18 @@ from pydantic import BaseModel
 from typing import Optional, List
 import os
 import json
+import logging
 import threading
 import pymysql
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
-load_dotenv()
 
+# Handlers doing blocking pymysql work are plain `def` so they run in FastAPI's threadpool
 router = APIRouter(prefix="/api", tags=["Profile"])
+logger = logging.getLogger(__name__)
 
 
 def _get_agent_db():
@@ -170,7 +174,7 @@ def _ensure_tables():
             """)
         db.commit()
     except Exception as e:
-        print(f"Table creation warning: {e}")
+        logger.warning("Table creation warning: %s", e)
     finally:
         if db:
             db.close()
@@ -231,13 +235,13 @@ class OutreachStatusUpdate(BaseModel):
 
 def _run_matching_thread(pid, profile, pos, st, sport):
     """Standalone thread target for AI college matching + enrichment."""
-    import asyncio as _aio, traceback as _tb
+    import asyncio as _aio
     from enrichment_worker import ai_match_programs_sync, enrich_college_targets, _get_agent_db as _edb
     try:
-        print(f"[Matching] Thread started: profile {pid} | {sport} {pos} from {st}")
+        logger.info("[Matching] Thread started: profile %s | %s %s from %s", pid, sport, pos, st)
         programs = ai_match_programs_sync(profile)
         if not programs:
-            print(f"[Matching] No programs returned for profile {pid}")
+            logger.info("[Matching] No programs returned for profile %s", pid)
             return
         db2 = _edb()
         try:
@@ -255,7 +259,7 @@ def _run_matching_thread(pid, profile, pos, st, sport):
                           prog.get("state",""), prog.get("division") or "D1",
                           fit_score, json.dumps([fit_summary] if fit_summary else [])))
             db2.commit()
-            print(f"[Matching] Stored {len(programs)} colleges for profile {pid}")
+            logger.info("[Matching] Stored %d colleges for profile %s", len(programs), pid)
         finally:
             db2.close()
         _aio.run(enrich_college_targets(
@@ -263,21 +267,31 @@ def _run_matching_thread(pid, profile, pos, st, sport):
             athlete_state=st, athlete_sport=sport,
         ))
     except Exception as e:
-        print(f"[Matching] Thread error: {e}")
-        _tb.print_exc()
+        logger.exception("[Matching] Thread error: %s", e)
 
 @router.get("/dashboard/{user_id}")
-async def get_dashboard(user_id: int):
+def get_dashboard(user_id: int):
     """Full dashboard data: profile + metrics + links + recent chats"""
     gmtm = _get_gmtm_db()
     agent_db = _get_agent_db()
     
     try:
         with gmtm.cursor() as c:
-            # Get athlete profile from GMTM (READ ONLY)
+            # Get athlete profile from GMTM (READ ONLY) — primary position and
+            # offer count ride along as scalar subqueries, one round-trip
             c.execute("""
                 SELECT u.user_id, u.first_name, u.last_name, u.email,
-                       l.city, l.province as state
+                       l.city, l.province as state,
+                       COALESCE((
+                           SELECT p.name
+                           FROM career c
+                           JOIN user_positions up ON up.career_id = c.career_id
+                           JOIN positions p ON up.position_id = p.position_id
+                           WHERE c.user_id = u.user_id AND up.is_primary = 1
+                           LIMIT 1
+                       ), 'N/A') as position,
+                       (SELECT COUNT(*) FROM scholarship_offers so
+                        WHERE so.user_id = u.user_id) as offer_count
                 FROM users u
                 LEFT JOIN locations l ON u.location_id = l.location_id
                 WHERE u.user_id = %s
@@ -287,17 +301,7 @@ async def get_dashboard(user_id: int):
             if not profile:
                 raise HTTPException(status_code=404, detail="Athlete not found")
             
-            # Get position
-            c.execute("""
-                SELECT p.name as position
-                FROM career c
-                JOIN user_positions up ON up.career_id = c.career_id
-                JOIN positions p ON up.position_id = p.position_id
-                WHERE c.user_id = %s AND up.is_primary = 1
-                LIMIT 1
-            """, (user_id,))
-            pos = c.fetchone()
-            profile['position'] = pos['position'] if pos else 'N/A'
+            offer_count = profile.pop('offer_count')
             
             # Get key metrics
             c.execute("""
@@ -310,14 +314,6 @@ async def get_dashboard(user_id: int):
                 ORDER BY title
             """, (user_id,))
             metrics = c.fetchall()
-            
-            # Get scholarship offers
-            c.execute("""
-                SELECT COUNT(*) as offer_count
-                FROM scholarship_offers
-                WHERE user_id = %s
-            """, (user_id,))
-            offers = c.fetchone()
         
         with agent_db.cursor() as c:
             # Get links
@@ -331,14 +327,20 @@ async def get_dashboard(user_id: int):
             for link in links:
                 link['created_at'] = str(link['created_at'])
             
-            # Get recent conversations
+            # Get recent conversations — pick the 5 first, then count their
+            # messages in one grouped join (agent_messages.idx_conv)
             c.execute("""
-                SELECT ac.id, ac.title, ac.updated_at,
-                       (SELECT COUNT(*) FROM agent_messages WHERE conversation_id = ac.id) as message_count
-                FROM agent_conversations ac
-                WHERE ac.user_id = %s
+                SELECT ac.id, ac.title, ac.updated_at, COUNT(am.id) as message_count
+                FROM (
+                    SELECT id, title, updated_at
+                    FROM agent_conversations
+                    WHERE user_id = %s
+                    ORDER BY updated_at DESC
+                    LIMIT 5
+                ) ac
+                LEFT JOIN agent_messages am ON am.conversation_id = ac.id
+                GROUP BY ac.id, ac.title, ac.updated_at
                 ORDER BY ac.updated_at DESC
-                LIMIT 5
             """, (user_id,))
             recent_chats = c.fetchall()
             for chat in recent_chats:
@@ -357,7 +359,7 @@ async def get_dashboard(user_id: int):
         return {
             "profile": profile,
             "metrics": metrics,
-            "offer_count": offers['offer_count'],
+            "offer_count": offer_count,
             "links": links,
             "recent_chats": recent_chats,
             "completeness": completeness,
@@ -372,7 +374,7 @@ async def get_dashboard(user_id: int):
 # ── Links CRUD ──────────────────────────
 
 @router.get("/links/{user_id}")
-async def get_links(user_id: int):
+def get_links(user_id: int):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -383,7 +385,7 @@ async def get_links(user_id: int):
 
 
 @router.post("/links")
-async def add_link(request: LinkCreate):
+def add_link(request: LinkCreate):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -398,7 +400,7 @@ async def add_link(request: LinkCreate):
 
 
 @router.delete("/links/{link_id}")
-async def delete_link(link_id: int):
+def delete_link(link_id: int):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -412,7 +414,7 @@ async def delete_link(link_id: int):
 # ── Connect Clerk to athlete ────────────
 
 @router.post("/profile/connect")
-async def connect_profile(request: ProfileConnect):
+def connect_profile(request: ProfileConnect):
     """Link a Clerk user ID to an athlete ID"""
     db = _get_agent_db()
     try:
@@ -428,7 +430,7 @@ async def connect_profile(request: ProfileConnect):
 
 
 @router.get("/athlete/search")
-async def search_athletes(name: str):
+def search_athletes(name: str):
     """Search athletes by name (READ ONLY from GMTM)"""
     if len(name.strip()) < 2:
         return {"athletes": []}
@@ -455,19 +457,25 @@ async def search_athletes(name: str):
                     LIMIT 20
                 """, (f"{name.strip()}%", f"{name.strip()}%"))
             athletes = c.fetchall()
+            if not athletes:
+                return {"athletes": []}
             
-            # Get positions
+            # Get primary positions for every match in one round-trip;
+            # MySQL picks the first name per athlete via GROUP_CONCAT
+            user_ids = [a['user_id'] for a in athletes]
+            placeholders = ", ".join(["%s"] * len(user_ids))
+            c.execute(f"""
+                SELECT c.user_id,
+                       SUBSTRING_INDEX(GROUP_CONCAT(p.name SEPARATOR '|'), '|', 1) as position
+                FROM career c
+                JOIN user_positions up ON up.career_id = c.career_id
+                JOIN positions p ON up.position_id = p.position_id
+                WHERE c.user_id IN ({placeholders}) AND up.is_primary = 1
+                GROUP BY c.user_id
+            """, user_ids)
+            positions = {row['user_id']: row['position'] for row in c.fetchall()}
             for a in athletes:
-                c.execute("""
-                    SELECT p.name as position
-                    FROM career c
-                    JOIN user_positions up ON up.career_id = c.career_id
-                    JOIN positions p ON up.position_id = p.position_id
-                    WHERE c.user_id = %s AND up.is_primary = 1
-                    LIMIT 1
-                """, (a['user_id'],))
-                pos = c.fetchone()
-                a['position'] = pos['position'] if pos else None
+                a['position'] = positions.get(a['user_id'])
             
             return {"athletes": athletes}
     finally:
@@ -475,7 +483,7 @@ async def search_athletes(name: str):
 
 
 @router.get("/profile/by-clerk/{clerk_id}")
-async def get_profile_by_clerk(clerk_id: str):
+def get_profile_by_clerk(clerk_id: str):
     """Look up athlete ID from Clerk user ID. Also checks sparq_profiles."""
     db = _get_agent_db()
     try:
@@ -498,7 +506,7 @@ async def get_profile_by_clerk(clerk_id: str):
 
 
 @router.post("/profile/create-from-onboarding")
-async def create_from_onboarding(payload: OnboardingPayload):
+def create_from_onboarding(payload: OnboardingPayload):
     if not payload.clerk_id:
         raise HTTPException(status_code=400, detail="clerk_id is required")
 
@@ -552,6 +560,9 @@ async def create_from_onboarding(payload: OnboardingPayload):
             c.execute("SELECT id FROM sparq_profiles WHERE clerk_id = %s", (payload.clerk_id,))
             profile_id = c.fetchone()["id"]
 
+        from agent_api import invalidate_athlete
+        invalidate_athlete(payload.clerk_id)
+
         # Build athlete profile for background AI matching + enrichment
         mp_raw = payload.maxprepsData or {}
         stats_preview = mp_raw.get("statsPreview") or []
@@ -577,7 +588,7 @@ async def create_from_onboarding(payload: OnboardingPayload):
             daemon=True, name=f"matching-{profile_id}"
         )
         t.start()
-        print(f"[Matching] Launched thread {t.name}")
+        logger.info("[Matching] Launched thread %s", t.name)
 
         return {
             "success": True,
@@ -589,7 +600,7 @@ async def create_from_onboarding(payload: OnboardingPayload):
 
 
 @router.get("/workspace/colleges/{clerk_id}")
-async def get_college_targets(clerk_id: str):
+def get_college_targets(clerk_id: str):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -637,7 +648,7 @@ async def get_college_targets(clerk_id: str):
 
 
 @router.get("/workspace/enrichment-status/{clerk_id}")
-async def get_enrichment_status(clerk_id: str):
+def get_enrichment_status(clerk_id: str):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -669,7 +680,7 @@ async def get_enrichment_status(clerk_id: str):
 
 
 @router.put("/workspace/colleges/{college_target_id}/status")
-async def update_college_status(college_target_id: int, body: StatusUpdate):
+def update_college_status(college_target_id: int, body: StatusUpdate):
     valid = {"Researching", "Interested", "Contacted", "Visited", "Offered", "Committed", "Declined"}
     if body.status not in valid:
         raise HTTPException(status_code=400, detail="Invalid status")
@@ -687,7 +698,7 @@ async def update_college_status(college_target_id: int, body: StatusUpdate):
 
 
 @router.get("/workspace/outreach/{clerk_id}")
-async def get_outreach_entries(clerk_id: str):
+def get_outreach_entries(clerk_id: str):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -709,7 +720,7 @@ async def get_outreach_entries(clerk_id: str):
 
 
 @router.post("/workspace/outreach/{clerk_id}")
-async def create_outreach_entry(clerk_id: str, body: OutreachCreate):
+def create_outreach_entry(clerk_id: str, body: OutreachCreate):
     valid_methods = {"Email", "Phone", "Visit", "Camp"}
     valid_statuses = {"Awaiting Response", "Responded", "Meeting Scheduled", "Archived"}
     if body.method not in valid_methods:
@@ -753,7 +764,7 @@ async def create_outreach_entry(clerk_id: str, body: OutreachCreate):
 
 
 @router.put("/workspace/outreach/{entry_id}/status")
-async def update_outreach_status(entry_id: int, body: OutreachStatusUpdate):
+def update_outreach_status(entry_id: int, body: OutreachStatusUpdate):
     valid_statuses = {"Awaiting Response", "Responded", "Meeting Scheduled", "Archived"}
     if body.status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
@@ -769,7 +780,7 @@ async def update_outreach_status(entry_id: int, body: OutreachStatusUpdate):
 
 
 @router.delete("/workspace/outreach/{entry_id}")
-async def delete_outreach_entry(entry_id: int):
+def delete_outreach_entry(entry_id: int):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -781,7 +792,7 @@ async def delete_outreach_entry(entry_id: int):
 
 
 @router.get("/workspace/stats/{clerk_id}")
-async def get_workspace_stats(clerk_id: str):
+def get_workspace_stats(clerk_id: str):
     db = _get_agent_db()
     base_breakdown = {
         "Researching": 0,
@@ -837,7 +848,7 @@ async def get_workspace_stats(clerk_id: str):
 
 
 @router.get("/workspace/timeline/{clerk_id}")
-async def get_workspace_timeline(clerk_id: str):
+def get_workspace_timeline(clerk_id: str):
     db = _get_agent_db()
     try:
         with db.cursor() as c:
@@ -890,19 +901,28 @@ async def get_workspace_timeline(clerk_id: str):
         db.close()
 
 
+# Max MaxPreps profile pages fetched at once per search
+MAXPREPS_FETCH_CONCURRENCY = 6
+
+MAXPREPS_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+# One keep-alive session for every MaxPreps fetch, so the search page and the
+# profile fan-out reuse pooled TLS connections instead of a handshake per page
+_maxpreps_session = requests.Session()
+_maxpreps_session.headers.update(MAXPREPS_HEADERS)
+_maxpreps_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
 @router.get("/maxpreps/search")
 async def maxpreps_search(q: str, limit: int = 8):
     """Search MaxPreps athletes: dedup, parallel stat fetch, sort by richness."""
-    import requests as _requests, json, re, asyncio
-    from concurrent.futures import ThreadPoolExecutor
-
-    HEADERS = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml",
-    }
+    import json, re, asyncio
 
     def _fetch_url(url):
-        return _requests.get(url, headers=HEADERS, timeout=10, allow_redirects=True).text
+        return _maxpreps_session.get(url, timeout=10, allow_redirects=True).text
 
     def _extract_next_data(html):
         m = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
@@ -910,10 +930,8 @@ async def maxpreps_search(q: str, limit: int = 8):
 
     # --- Fetch search results page ---
     search_url = f"https://www.maxpreps.com/search/?q={q.replace(' ', '+')}"
-    loop = asyncio.get_event_loop()
     try:
-        with ThreadPoolExecutor(max_workers=8) as pool:
-            html = await loop.run_in_executor(pool, _fetch_url, search_url)
+        html = await asyncio.to_thread(_fetch_url, search_url)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"MaxPreps fetch failed: {e}")
 
@@ -1010,9 +1028,17 @@ async def maxpreps_search(q: str, limit: int = 8):
         except Exception:
             return None
 
-    with ThreadPoolExecutor(max_workers=6) as pool:
-        futs = [loop.run_in_executor(pool, _fetch_stats, r["profileUrl"]) for r in base_results]
-        stats_list = await asyncio.gather(*futs, return_exceptions=True)
+    # Bounded fan-out on the default executor — no throwaway pool per request
+    fetch_slots = asyncio.Semaphore(MAXPREPS_FETCH_CONCURRENCY)
+
+    async def _bounded_fetch_stats(profile_url):
+        async with fetch_slots:
+            return await asyncio.to_thread(_fetch_stats, profile_url)
+
+    stats_list = await asyncio.gather(
+        *(_bounded_fetch_stats(r["profileUrl"]) for r in base_results),
+        return_exceptions=True,
+    )
 
     for result, stats in zip(base_results, stats_list):
         if isinstance(stats, dict):
@@ -1037,22 +1063,14 @@ async def maxpreps_search(q: str, limit: int = 8):
 @router.get("/maxpreps/athlete-stats")
 async def maxpreps_athlete_stats(url: str):
     """Fetch real stats from a MaxPreps athlete profile page."""
-    import requests as _requests, json, re
-    from concurrent.futures import ThreadPoolExecutor
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml",
-    }
+    import json, re, asyncio
 
     def _fetch():
-        resp = _requests.get(url, headers=headers, timeout=10, allow_redirects=True)
+        resp = _maxpreps_session.get(url, timeout=10, allow_redirects=True)
         return resp.text
 
     try:
-        loop = __import__('asyncio').get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            html = await loop.run_in_executor(pool, _fetch)
+        html = await asyncio.to_thread(_fetch)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"MaxPreps fetch failed: {e}")
 
@@ -1101,7 +1119,7 @@ async def maxpreps_athlete_stats(url: str):
 
 
 @router.post("/workspace/trigger-matching/{clerk_id}")
-async def trigger_matching(clerk_id: str):
+def trigger_matching(clerk_id: str):
     """Manually re-trigger AI college matching for an existing profile."""
     db = _get_agent_db()
     try:
@@ -1154,12 +1172,12 @@ async def trigger_matching(clerk_id: str):
         daemon=True, name=f"matching-trigger-{profile_id}"
     )
     t.start()
-    print(f"[Matching] Trigger thread launched: {t.name}")
+    logger.info("[Matching] Trigger thread launched: %s", t.name)
     return {"status": "matching started", "profile_id": profile_id, "sport": sport_label, "position": position}
 
 
 @router.get("/workspace/profile/{clerk_id}")
-async def get_profile(clerk_id: str):
+def get_profile(clerk_id: str):
     """Return full sparq_profiles row for the workspace profile editor."""
     db = _get_agent_db()
     try:
@@ -1194,7 +1212,7 @@ class ProfileUpdatePayload(BaseModel):
 
 
 @router.patch("/workspace/profile/{clerk_id}")
-async def update_profile(clerk_id: str, payload: ProfileUpdatePayload):
+def update_profile(clerk_id: str, payload: ProfileUpdatePayload):
     """Update editable fields on an existing sparq_profile."""
     db = _get_agent_db()
     try:
@@ -1225,11 +1243,14 @@ async def update_profile(clerk_id: str, payload: ProfileUpdatePayload):
     finally:
         db.close()
 
+    from agent_api import invalidate_athlete
+    invalidate_athlete(clerk_id)
+
     return {"success": True}
 
 
 @router.get("/workspace/colleges/{clerk_id}/{college_id}")
-async def get_college_detail(clerk_id: str, college_id: int):
+def get_college_detail(clerk_id: str, college_id: int):
     """Return full college target detail including research_data."""
     db = _get_agent_db()
     try:
@@ -1310,9 +1331,14 @@ Return ONLY a valid JSON object in this exact format:
 
 Return ONLY the JSON. No markdown, no code blocks, no explanation."""
 
+# Same prefix (web_search tool + this prompt) on every deep research call
+DEEP_RESEARCH_SYSTEM_BLOCKS = [
+    {"type": "text", "text": DEEP_RESEARCH_SYSTEM, "cache_control": {"type": "ephemeral"}},
+]
+
 
 @router.post("/workspace/colleges/{clerk_id}/{college_id}/research")
-async def run_deep_research(clerk_id: str, college_id: int, background_tasks: BackgroundTasks):
+def run_deep_research(clerk_id: str, college_id: int, background_tasks: BackgroundTasks):
     """Trigger deep per-college research for an athlete."""
     db = _get_agent_db()
     try:
@@ -1380,16 +1406,16 @@ async def run_deep_research(clerk_id: str, college_id: int, background_tasks: Ba
                 f"If sport includes 'Girls' or 'Women', research ONLY the women's program. "
                 f"Provide deep, specific information useful for a recruiting decision."
             )
-            print(f"[DeepResearch] Starting for college_target {cid}: {name}")
+            logger.info("[DeepResearch] Starting for college_target %s: %s", cid, name)
             response = client.messages.create(
                 model="claude-sonnet-4-6",
                 max_tokens=4000,
-                system=DEEP_RESEARCH_SYSTEM,
+                system=DEEP_RESEARCH_SYSTEM_BLOCKS,
                 tools=[{"type": "web_search_20260209", "name": "web_search"}],
                 messages=[{"role": "user", "content": prompt}],
             )
             full_text = "".join(b.text for b in response.content if hasattr(b, "text"))
-            print(f"[DeepResearch] Got {len(full_text)} chars for {name}")
+            logger.info("[DeepResearch] Got %d chars for %s", len(full_text), name)
 
             research_data = None
             for pattern in [r'\{[\s\S]*\}']:
@@ -1409,11 +1435,9 @@ async def run_deep_research(clerk_id: str, college_id: int, background_tasks: Ba
                     WHERE id = %s
                 """, (json.dumps(research_data) if research_data else None, status, cid))
             db2.commit()
-            print(f"[DeepResearch] Stored for {name} — status: {status}")
+            logger.info("[DeepResearch] Stored for %s — status: %s", name, status)
         except Exception as e:
-            import traceback
-            print(f"[DeepResearch] Error for {name}: {e}")
-            traceback.print_exc()
+            logger.exception("[DeepResearch] Error for %s: %s", name, e)
             with db2.cursor() as c2:
                 c2.execute("UPDATE college_targets SET deep_research_status = 'error' WHERE id = %s", (cid,))
             db2.commit()
@@ -1427,6 +1451,6 @@ async def run_deep_research(clerk_id: str, college_id: int, background_tasks: Ba
         name=f"deep-research-{college_id}"
     )
     t.start()
-    print(f"[DeepResearch] Thread launched for college {college_id} ({college_name})")
+    logger.info("[DeepResearch] Thread launched for college %s (%s)", college_id, college_name)
 
     return {"status": "researching", "college_id": college_id, "college_name": college_name}
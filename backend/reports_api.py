@@ -14,7 +14,6 @@ import pymysql
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
-load_dotenv()
 
 router = APIRouter(prefix="/api", tags=["Reports"])
 
@@ -41,7 +40,7 @@ class ReportCreate(BaseModel):
 
 
 @router.get("/reports/{user_id}")
-async def list_reports(user_id: int, report_type: Optional[str] = None):
+def list_reports(user_id: int, report_type: Optional[str] = None):
     """List all reports for an athlete"""
     db = _get_agent_db()
     try:
@@ -68,7 +67,7 @@ async def list_reports(user_id: int, report_type: Optional[str] = None):
 
 
 @router.get("/reports/{user_id}/{report_id}")
-async def get_report(user_id: int, report_id: int):
+def get_report(user_id: int, report_id: int):
     """Get a full report"""
     db = _get_agent_db()
     try:
@@ -87,7 +86,7 @@ async def get_report(user_id: int, report_id: int):
 
 
 @router.post("/reports")
-async def create_report(request: ReportCreate):
+def create_report(request: ReportCreate):
     """Save a new report"""
     db = _get_agent_db()
     try:
@@ -111,7 +110,7 @@ async def create_report(request: ReportCreate):
 
 
 @router.delete("/reports/{report_id}")
-async def delete_report(report_id: int):
+def delete_report(report_id: int):
     """Delete a report"""
     db = _get_agent_db()
     try:
@@ -161,7 +160,7 @@ def _decode_share_token(token: str) -> tuple[int, int]:
 
 
 @router.get("/reports/{user_id}/{report_id}/share-token")
-async def get_share_token(user_id: int, report_id: int):
+def get_share_token(user_id: int, report_id: int):
     """Generate a shareable token for a report (no DB change needed)."""
     # Verify the report exists and belongs to this user
     db = _get_agent_db()
@@ -187,7 +186,7 @@ async def get_share_token(user_id: int, report_id: int):
 
 
 @router.get("/reports/public/{token}")
-async def get_public_report(token: str):
+def get_public_report(token: str):
     """Fetch a report by share token — no auth required."""
     user_id, report_id = _decode_share_token(token)
     db = _get_agent_db()
@@ -548,7 +548,7 @@ async def structured_search(
         metric_filters.append(("bench", ">", request.min_bench))
 
     # Build query
-    query = build_search_query(
+    query, params = build_search_query(
         state=request.state,
         position=request.position,
         graduation_year=request.graduation_year,
@@ -563,6 +563,7 @@ async def structured_search(
     return {
         "status": "query_generated",
         "sql": query,
+        "params": params,
         "filters": request.dict(exclude_none=True),
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -378,7 +378,7 @@ export default function AgentChat({ athleteId, athleteName, initialConversationI
                 })
               } catch {}
             } else if (eventType === 'text') {
-              streamedText += data.replace(/\\n/g, '\n')
+              streamedText += JSON.parse(data).text
               setMessages((prev) => {
                 const updated = [...prev]
                 const last = updated[updated.length - 1]
@@ -393,11 +393,12 @@ export default function AgentChat({ athleteId, athleteName, initialConversationI
                 return updated
               })
             } else if (eventType === 'error') {
+              const { message } = JSON.parse(data)
               setMessages((prev) => {
                 const updated = [...prev]
                 updated[updated.length - 1] = {
                   role: 'assistant',
-                  content: `Something went wrong: ${data}. Try again?`,
+                  content: `Something went wrong: ${message}. Try again?`,
                   timestamp: new Date(),
                   thinking: false,
                 }
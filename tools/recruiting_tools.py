@@ -3,41 +3,38 @@ Recruiting Tools - Database queries for athlete matching and analysis
 """
 
 import os
+from contextlib import closing
+
 import pymysql
 from typing import Dict, List, Optional
+from dbutils.pooled_db import PooledDB
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', '.env'))
-load_dotenv()
+
+# Every tool call borrows a connection for its own queries and hands it back
+GMTM_POOL = PooledDB(
+    creator=pymysql,
+    maxcached=10,
+    maxconnections=20,
+    blocking=True,
+    ping=1,
+    host=os.getenv('DB_HOST'),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database='gmtm',
+    port=3306,
+    cursorclass=pymysql.cursors.DictCursor
+)
 
 
 class RecruitingTools:
     """Database-powered recruiting intelligence"""
     
-    def __init__(self):
-        self.db = None
-    
-    def _connect(self):
-        if not self.db or not self.db.open:
-            self.db = pymysql.connect(
-                host=os.getenv('DB_HOST'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                database='gmtm',
-                port=3306,
-                cursorclass=pymysql.cursors.DictCursor
-            )
-    
-    def _close(self):
-        if self.db:
-            self.db.close()
-            self.db = None
-    
     def match_programs(self, athlete: Dict, state: str = None, limit: int = 15, preferences: Dict = None) -> Dict:
         """Find college programs that match athlete's profile"""
         try:
-            self._connect()
-            with self.db.cursor() as c:
+            with closing(GMTM_POOL.connection()) as db, db.cursor() as c:
                 sport = athlete.get('sport', 'Football (American)')
                 state = athlete.get('state', '')
                 position = athlete.get('position', '')
@@ -102,8 +99,6 @@ class RecruitingTools:
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
-        finally:
-            self._close()
     
     def analyze_profile(self, athlete: Dict, position: str = None) -> Dict:
         """Analyze athlete's metrics compared to peers"""
@@ -111,8 +106,7 @@ class RecruitingTools:
             user_id = athlete.get('user_id') if isinstance(athlete, dict) else athlete
             if not position and isinstance(athlete, dict):
                 position = athlete.get('position')
-            self._connect()
-            with self.db.cursor() as c:
+            with closing(GMTM_POOL.connection()) as db, db.cursor() as c:
                 # Get athlete's metrics
                 c.execute("""
                     SELECT title, value, unit, verified, percentile
@@ -215,14 +209,11 @@ class RecruitingTools:
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
-        finally:
-            self._close()
     
     def get_scholarship_offers(self, user_id: int) -> Dict:
         """Get scholarship offers for an athlete"""
         try:
-            self._connect()
-            with self.db.cursor() as c:
+            with closing(GMTM_POOL.connection()) as db, db.cursor() as c:
                 c.execute("""
                     SELECT o.name as school, so.status, so.created_on
                     FROM scholarship_offers so
@@ -252,8 +243,6 @@ class RecruitingTools:
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
-        finally:
-            self._close()
 
 
 recruiting_tools = RecruitingTools()